@@ -0,0 +1,139 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+def _numbered_tokens(normalized):
+    """Tokens containing digits (section / article numbers) must match exactly"""
+    return frozenset(token for token in normalized.split() if any(c.isdigit() for c in token))
+
+
+class AnswerCache:
+    """In-memory answer cache with exact and near-duplicate question matching.
+
+    Entries are grouped by scope (e.g. endpoint, doc_type, n_chunks). A lookup
+    first tries the exact normalized question, then the most similar cached
+    question in the same scope by embedding cosine similarity. Any change to
+    the collection invalidates everything.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, similarity_threshold=None, embed_fn=None):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.ANSWER_CACHE_TTL
+        self.similarity_threshold = similarity_threshold or settings.ANSWER_CACHE_SIMILARITY
+        self.embed_fn = embed_fn
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped on every invalidation; answers computed against an older
+        # version are not stored
+        self.version = 0
+
+    def _embed(self, normalized):
+        if self.embed_fn is None:
+            # Imported lazily: the embedding model lives with LexoraAI
+            from app.core.lexora import embed_chunks
+            self.embed_fn = embed_chunks
+        vector = np.asarray(self.embed_fn([normalized])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, question, scope, semantic=True):
+        """Return a copy of the cached response, or None"""
+        normalized = normalize_question(question)
+        key = (scope, normalized)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now - entry["created"] <= self.ttl:
+                self.entries.move_to_end(key)
+                self.hits_exact += 1
+                CACHE_REQUESTS.inc(cache="answer", result="exact")
+                return copy.deepcopy(entry["response"])
+
+        if not semantic:
+            with self.lock:
+                self.misses += 1
+            CACHE_REQUESTS.inc(cache="answer", result="miss")
+            return None
+
+        vector = self._embed(normalized)
+        numbers = _numbered_tokens(normalized)
+
+        with self.lock:
+            candidates = [
+                (k, e) for k, e in self.entries.items()
+                if k[0] == scope
+                and e["vector"] is not None
+                and e["numbers"] == numbers
+                and now - e["created"] <= self.ttl
+            ]
+            if candidates:
+                matrix = np.stack([e["vector"] for _, e in candidates])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    best_key, best_entry = candidates[best]
+                    self.entries.move_to_end(best_key)
+                    self.hits_semantic += 1
+                    CACHE_REQUESTS.inc(cache="answer", result="semantic")
+                    return copy.deepcopy(best_entry["response"])
+            self.misses += 1
+        CACHE_REQUESTS.inc(cache="answer", result="miss")
+        return None
+
+    def put(self, question, scope, response, semantic=True, version=None):
+        """Cache a response; pass the version read before computing it"""
+        normalized = normalize_question(question)
+        vector = self._embed(normalized) if semantic else None
+        with self.lock:
+            if version is not None and version != self.version:
+                return
+            self.entries[(scope, normalized)] = {
+                "response": copy.deepcopy(response),
+                "vector": vector,
+                "numbers": _numbered_tokens(normalized),
+                "created": time.time()
+            }
+            self.entries.move_to_end((scope, normalized))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every entry - call whenever the collection changes"""
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+            self.version += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits_exact + self.hits_semantic + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_exact + self.hits_semantic) / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
+
+
+# Global instance
+answer_cache = AnswerCache()
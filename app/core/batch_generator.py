@@ -0,0 +1,285 @@
+"""
+Micro-batching generation server for an in-process Hugging Face causal LM.
+
+Callers submit prompts from any thread and iterate the returned request for
+text pieces. A single generation thread collects the prompts that arrive
+within HF_BATCH_WINDOW_MS (up to HF_BATCH_SIZE), groups prompts of similar
+length, left-pads them and decodes them together with one KV cache. Rows
+that finish (EOS, token limit, cancelled) are dropped from the cache so the
+rest of the batch keeps decoding at full speed; prompts that did not fit
+the length bucket are served first on the next cycle.
+
+    batcher = BatchGenerator(tokenizer, model, device)
+    for text in batcher.submit(prompt, {"num_predict": 128}, threading.Event()):
+        ...
+"""
+import logging
+import queue
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = registry.histogram(
+    "lexora_llm_batch_size", "Prompts decoded together per batch", buckets=(1, 2, 4, 8, 16, 32)
+)
+
+_END = object()
+
+
+class BatchRequest:
+    """One prompt in flight; iterate it for text pieces as they are decoded"""
+
+    def __init__(self, prompt, options, cancelled):
+        self.prompt = prompt
+        self.options = options
+        self.cancelled = cancelled
+        self.max_new_tokens = options.get("num_predict", settings.LLM_MAX_TOKENS)
+        self.ids = None
+        self.generated = []
+        self.text = ""
+        self.output = queue.Queue()
+
+    def emit(self, tokenizer):
+        # Decode the whole continuation so multi-token characters come out whole
+        text = tokenizer.decode(self.generated, skip_special_tokens=True)
+        if len(text) > len(self.text) and not text.endswith("\ufffd"):
+            self.output.put(text[len(self.text):])
+            self.text = text
+
+    def finish(self, error=None):
+        self.output.put(error if error is not None else _END)
+
+    def __iter__(self):
+        while True:
+            item = self.output.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def sample_token(logits, options):
+    """Greedy at temperature 0, else temperature / top-k / top-p sampling"""
+    import torch
+
+    temperature = options.get("temperature", 0.7)
+    if temperature <= 0:
+        return int(torch.argmax(logits))
+    logits = logits.float() / temperature
+    top_k = options.get("top_k")
+    if top_k:
+        threshold = torch.topk(logits, min(top_k, logits.size(-1))).values[-1]
+        logits = logits.masked_fill(logits < threshold, float("-inf"))
+    top_p = options.get("top_p", 1.0)
+    if top_p < 1.0:
+        ordered, order = torch.sort(logits, descending=True)
+        probs = torch.softmax(ordered, dim=-1)
+        drop = torch.cumsum(probs, dim=-1) - probs > top_p
+        ordered = ordered.masked_fill(drop, float("-inf"))
+        logits = torch.full_like(logits, float("-inf")).scatter(0, order, ordered)
+    return int(torch.multinomial(torch.softmax(logits, dim=-1), 1))
+
+
+class BatchGenerator:
+    def __init__(self, tokenizer, model, device, max_batch=None, window_ms=None, max_input_tokens=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.max_batch = max_batch or settings.HF_BATCH_SIZE
+        self.window = (window_ms if window_ms is not None else settings.HF_BATCH_WINDOW_MS) / 1000
+        self.max_input_tokens = max_input_tokens or settings.HF_MAX_INPUT_TOKENS
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.eos_ids = self._eos_ids()
+        self.pending = queue.Queue()
+        self.carry = []
+        self.closing = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def _eos_ids(self):
+        ids = {self.tokenizer.eos_token_id}
+        configured = getattr(getattr(self.model, "generation_config", None), "eos_token_id", None)
+        if isinstance(configured, int):
+            ids.add(configured)
+        elif configured:
+            ids.update(configured)
+        ids.discard(None)
+        return ids
+
+    def submit(self, prompt, options, cancelled):
+        """Queue a prompt; returns a BatchRequest to iterate for text"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._serve, name="hf-batcher", daemon=True)
+                self.thread.start()
+        request = BatchRequest(prompt, options, cancelled)
+        self.pending.put(request)
+        return request
+
+    def close(self):
+        """Stop the generation thread after the current batch"""
+        self.pending.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout=30)
+            self.thread = None
+
+    # ============= BATCHING LOOP =============
+
+    def _serve(self):
+        while not self.closing:
+            collected = self._collect()
+            if not collected:
+                continue
+            batch = self._bucket(collected)
+            if not batch:
+                continue
+            BATCH_SIZE.observe(len(batch))
+            start = time.perf_counter()
+            try:
+                self._decode(batch)
+            except Exception as e:
+                logger.exception("Batched generation failed: %s", e)
+                for request in batch:
+                    request.finish(e)
+            logger.debug("Decoded batch of %d in %.2fs", len(batch), time.perf_counter() - start)
+        # Fail whatever is still waiting so no caller blocks forever
+        leftover = self.carry
+        while True:
+            try:
+                leftover.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        for request in leftover:
+            if request is not None:
+                request.finish(RuntimeError("Generator closed"))
+
+    def _collect(self):
+        """Carried-over prompts plus whatever arrives within the batching window"""
+        batch, self.carry = self.carry, []
+        if not batch:
+            item = self.pending.get()
+            if item is None:
+                self.closing = True
+                return []
+            batch.append(item)
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.closing = True
+                break
+            batch.append(item)
+        return batch
+
+    def _bucket(self, collected):
+        """Oldest prompt plus those of similar length; the rest wait for the next batch"""
+        live = []
+        for request in collected:
+            if request.cancelled.is_set():
+                request.finish()
+                continue
+            if request.ids is None:
+                request.ids = self.tokenizer(
+                    request.prompt, truncation=True, max_length=self.max_input_tokens
+                )["input_ids"]
+            live.append(request)
+        if not live:
+            return []
+        anchor = len(live[0].ids)
+        ratio = settings.HF_BATCH_LENGTH_RATIO
+        batch = []
+        for request in live:
+            length = len(request.ids)
+            if len(batch) < self.max_batch and anchor / ratio <= length <= anchor * ratio:
+                batch.append(request)
+            else:
+                self.carry.append(request)
+        return batch
+
+    def _decode(self, batch):
+        import torch
+        from transformers import DynamicCache
+
+        longest = max(len(request.ids) for request in batch)
+        input_ids = torch.full((len(batch), longest), self.pad_id, dtype=torch.long)
+        attention = torch.zeros((len(batch), longest), dtype=torch.long)
+        for row, request in enumerate(batch):
+            # Left padding keeps every row's last prompt token in the same column
+            input_ids[row, longest - len(request.ids):] = torch.tensor(request.ids)
+            attention[row, longest - len(request.ids):] = 1
+        input_ids = input_ids.to(self.device)
+        attention = attention.to(self.device)
+        positions = (attention.cumsum(-1) - 1).clamp(min=0)
+
+        with torch.inference_mode():
+            # An explicit growable cache: left to itself Gemma 3 may build one sized
+            # to the prompt, which has no room to decode into and cannot drop rows
+            past = DynamicCache()
+            out = self.model(
+                input_ids=input_ids,
+                attention_mask=attention,
+                position_ids=positions,
+                past_key_values=past,
+                use_cache=True
+            )
+            past = out.past_key_values
+            logits = out.logits[:, -1, :]
+            next_positions = positions[:, -1] + 1
+            # rows[j] is the batch index decoded in cache row j, None once it has finished
+            rows = list(range(len(batch)))
+
+            while True:
+                next_tokens = []
+                for j, i in enumerate(rows):
+                    if i is None:
+                        next_tokens.append(self.pad_id)
+                        continue
+                    request = batch[i]
+                    token = sample_token(logits[j], request.options)
+                    if token in self.eos_ids:
+                        rows[j] = None
+                        request.finish()
+                        next_tokens.append(self.pad_id)
+                        continue
+                    request.generated.append(token)
+                    request.emit(self.tokenizer)
+                    if len(request.generated) >= request.max_new_tokens or request.cancelled.is_set():
+                        rows[j] = None
+                        request.finish()
+                    next_tokens.append(token)
+
+                keep = [j for j, i in enumerate(rows) if i is not None]
+                if not keep:
+                    return
+                if len(keep) < len(rows):
+                    index = torch.tensor(keep, device=self.device)
+                    past.batch_select_indices(index)
+                    attention = attention[index]
+                    next_positions = next_positions[index]
+                    next_tokens = [next_tokens[j] for j in keep]
+                    rows = [rows[j] for j in keep]
+
+                attention = torch.cat(
+                    [attention, torch.ones((len(rows), 1), dtype=attention.dtype, device=self.device)], dim=1
+                )
+                out = self.model(
+                    input_ids=torch.tensor(next_tokens, device=self.device).unsqueeze(1),
+                    attention_mask=attention,
+                    position_ids=next_positions.unsqueeze(1),
+                    past_key_values=past,
+                    use_cache=True
+                )
+                past = out.past_key_values
+                logits = out.logits[:, -1, :]
+                next_positions = next_positions + 1
@@ -6,6 +6,9 @@ class ChromaDBManager:
     _instance = None
     _client = None
     _collection = None
+    _db_path = "./chromadb_data"
+    _collection_name = "crpc_chapters_chunked"
+    _collection_metadata = {"hnsw:space": "cosine"}
     
     def __new__(cls):
         if cls._instance is None:
@@ -15,10 +18,13 @@ class ChromaDBManager:
     def initialize(self, db_path="./chromadb_data", collection_name="crpc_chapters_chunked"):
         """Initialize ChromaDB client and collection - call once in main.py"""
         if self._client is None:
+            self._db_path = db_path
+            self._collection_name = collection_name
             self._client = chromadb.PersistentClient(path=db_path)
+            self.recover_swap()
             self._collection = self._client.get_or_create_collection(
                 name=collection_name,
-                metadata={"hnsw:space": "cosine"}
+                metadata=self._collection_metadata
             )
         return self._client, self._collection
     
@@ -33,6 +39,64 @@ class ChromaDBManager:
         if self._collection is None:
             self.initialize()
         return self._collection
+    
+    def get_db_path(self):
+        return self._db_path
+    
+    def get_collection_name(self):
+        return self._collection_name
+    
+    def get_collection_metadata(self):
+        """Metadata (HNSW settings) the serving collection is created with"""
+        return dict(self._collection_metadata)
+    
+    def reset_collection(self):
+        """Drop and recreate the collection - far cheaper than deleting every id"""
+        client = self.get_client()
+        client.delete_collection(name=self._collection_name)
+        self._collection = client.get_or_create_collection(
+            name=self._collection_name,
+            metadata=self._collection_metadata
+        )
+        return self._collection
+    
+    def _exists(self, name):
+        try:
+            self._client.get_collection(name=name)
+            return True
+        except Exception:
+            return False
+    
+    def recover_swap(self):
+        """Finish or undo a compaction swap that was interrupted; True if the collection was restored.
+        
+        While the collection exists it is the live corpus and leftovers are
+        dropped. Without it, `<name>__old` is the untouched original and wins
+        over a copy; a lone `<name>__compact` is the only surviving copy.
+        """
+        name = self._collection_name
+        leftovers = (f"{name}__old", f"{name}__compact")
+        restored = False
+        if not self._exists(name):
+            for candidate in leftovers:
+                if self._exists(candidate):
+                    self._client.get_collection(name=candidate).modify(name=name)
+                    restored = True
+                    break
+        for leftover in leftovers:
+            if self._exists(leftover):
+                self._client.delete_collection(name=leftover)
+        return restored
+    
+    def use_collection(self, collection):
+        """Send reads and writes to another collection (e.g. a bulk-load staging one) until reload_collection()"""
+        self._collection = collection
+        return self._collection
+    
+    def reload_collection(self):
+        """Re-open the collection by name (after it was replaced, e.g. by compaction)"""
+        self._collection = self.get_client().get_collection(name=self._collection_name)
+        return self._collection
 
 
 # Global instance
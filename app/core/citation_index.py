@@ -0,0 +1,323 @@
+import json
+import os
+import re
+import threading
+
+from app.core.config import settings
+
+# Heading patterns - same shapes as LEGAL_HEADING_PATTERNS in
+# app/services/document_ingestion.py, with capture groups for the numbers
+HEADING_PATTERNS = [
+    ("section", re.compile(r'^(?:Section|SECTION|S\.|Sec\.)\s*(\d+[A-Z]{0,3})\b((?:\s*\(\s*\w{1,4}\s*\))*)')),
+    ("article", re.compile(r'^(?:Article|ARTICLE)\s*(\d+[A-Z]{0,3})\b((?:\s*\(\s*\w{1,4}\s*\))*)')),
+    ("clause", re.compile(r'^(?:Clause|CLAUSE)\s*(\d+(?:\.\d+)*)()')),
+    ("clause", re.compile(r'^(\d+\.\d+(?:\.\d+)*)()')),
+]
+
+# Bare-act numbering: "438. Direction for grant of bail ...". Judgments and
+# contracts number their paragraphs the same way, so this only applies to
+# sources that are known to be acts
+BARE_SECTION_PATTERN = ("section", re.compile(r'^(\d+[A-Z]{0,3})\.\s+[A-Z]()'))
+BARE_ACT_DOC_TYPES = {"bare_act"}
+
+# Citations inside a free-text question
+QUESTION_PATTERNS = [
+    ("section", re.compile(r'\b(?:section|sec\.?|s\.)\s*(\d+[a-z]{0,3})\b((?:\s*\(\s*\w{1,4}\s*\))*)')),
+    ("article", re.compile(r'\b(?:article|art)\.?\s*(\d+[a-z]{0,3})\b((?:\s*\(\s*\w{1,4}\s*\))*)')),
+    ("clause", re.compile(r'\bclause\s*(\d+(?:\.\d+)*)()')),
+    ("section", re.compile(r'\b(?:ipc|crpc|cpc|bns|bnss)\s*(\d+[a-z]{0,3})\b()')),
+]
+
+ACT_ALIASES = {
+    "crpc": ["crpc", "code of criminal procedure", "criminal procedure"],
+    "ipc": ["ipc", "indian penal code", "penal code"],
+    "cpc": ["cpc", "code of civil procedure", "civil procedure"],
+    "constitution": ["constitution"],
+    "evidence": ["evidence act"],
+    "bnss": ["bnss", "nagarik suraksha"],
+    "bns": ["bns", "nyaya sanhita"],
+}
+
+ANY_ACT = "*"
+UNKNOWN_ACT = "?"
+
+# Bumped when the indexing rules change; an older snapshot is rebuilt from the collection
+INDEX_VERSION = 2
+
+
+def detect_act(text):
+    """Map free text (a question, a source filename, a doc_type) to a known act key"""
+    lowered = re.sub(r"[^a-z0-9 ]", " ", text.lower())
+    lowered = f" {' '.join(lowered.split())} "
+    for act, aliases in ACT_ALIASES.items():
+        for alias in aliases:
+            if f" {alias} " in lowered:
+                return act
+    return None
+
+def _subsection(raw):
+    parts = re.findall(r'\(\s*(\w{1,4})\s*\)', raw or "")
+    return "".join(f"({part.lower()})" for part in parts)
+
+def citation_key(act, kind, number, subsection=""):
+    return f"{act or ANY_ACT}|{kind}|{number.lower()}|{subsection}"
+
+def headings_in(text, bare_sections=False):
+    """(kind, number, subsection) for every heading line in a chunk"""
+    patterns = HEADING_PATTERNS + [BARE_SECTION_PATTERN] if bare_sections else HEADING_PATTERNS
+    found = []
+    for line in text.splitlines():
+        line = line.strip()
+        for kind, pattern in patterns:
+            match = pattern.match(line)
+            if match:
+                found.append((kind, match.group(1).lower(), _subsection(match.group(2))))
+                break
+    return found
+
+def parse_question(question):
+    """The provisions a question names, as (act, kind, number, subsection) tuples"""
+    lowered = question.lower()
+    act = detect_act(question)
+    citations = []
+    for kind, pattern in QUESTION_PATTERNS:
+        for match in pattern.finditer(lowered):
+            citation = (act, kind, match.group(1), _subsection(match.group(2)))
+            if citation not in citations:
+                citations.append(citation)
+    return citations
+
+
+class CitationIndex:
+    """Maps normalized citations (act, section/article/clause, subsection) to chunk ids.
+
+    A chunk without a heading of its own inherits the last heading seen
+    earlier in the same source, so a provision maps to every chunk of its body.
+    Persisted like LexicalIndex: a JSON snapshot plus an append-only journal,
+    folded into the snapshot every `compact_every` entries.
+    """
+
+    def __init__(self, path=None, compact_every=None):
+        self.path = path or settings.CITATION_INDEX_PATH
+        self.journal_path = self.path + ".log"
+        self.compact_every = compact_every or settings.CITATION_INDEX_COMPACT_EVERY
+        self.lock = threading.RLock()
+        self.keys = {}
+        self.chunk_keys = {}
+        self.sources = {}
+        self.chunk_sources = {}
+        self.journal_entries = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.chunk_keys)
+
+    def _add_chunk(self, chunk_id, keys, source):
+        self.chunk_keys[chunk_id] = keys
+        self.chunk_sources[chunk_id] = source
+        for key in keys:
+            self.keys.setdefault(key, []).append(chunk_id)
+
+    def _remove_chunk(self, chunk_id):
+        self.chunk_sources.pop(chunk_id, None)
+        for key in self.chunk_keys.pop(chunk_id, []):
+            ids = self.keys.get(key)
+            if ids is not None:
+                if chunk_id in ids:
+                    ids.remove(chunk_id)
+                if not ids:
+                    del self.keys[key]
+
+    def _index_source(self, source, ids, chunks, doc_type):
+        act = detect_act(f"{source} {doc_type or ''}")
+        bare_sections = act is not None or doc_type in BARE_ACT_DOC_TYPES
+        current = []
+        for chunk_id, text in zip(ids, chunks):
+            headings = headings_in(text, bare_sections)
+            if headings:
+                current = headings
+            keys = []
+            for kind, number, subsection in current:
+                for act_key in (act or UNKNOWN_ACT, ANY_ACT):
+                    keys.append(citation_key(act_key, kind, number, subsection))
+                    if subsection:
+                        keys.append(citation_key(act_key, kind, number))
+            if keys:
+                self._add_chunk(chunk_id, list(dict.fromkeys(keys)), source)
+        self.sources[source] = list(ids)
+
+    def _apply_source(self, source, ids, chunk_keys):
+        self._drop_source(source)
+        for chunk_id in ids:
+            if chunk_id in chunk_keys:
+                self._add_chunk(chunk_id, chunk_keys[chunk_id], source)
+        self.sources[source] = list(ids)
+
+    def _apply_remove(self, ids):
+        removed = set(ids)
+        for chunk_id in removed:
+            self._remove_chunk(chunk_id)
+        for source, source_ids in list(self.sources.items()):
+            remaining = [chunk_id for chunk_id in source_ids if chunk_id not in removed]
+            if len(remaining) == len(source_ids):
+                continue
+            if remaining:
+                self.sources[source] = remaining
+            else:
+                del self.sources[source]
+
+    def replace_source(self, source, ids, chunks, doc_type="general"):
+        """(Re)index every chunk of one source, in document order"""
+        with self.lock:
+            self.load()
+            self._drop_source(source)
+            self._index_source(source, ids, chunks, doc_type)
+            self._journal({
+                "op": "source",
+                "source": source,
+                "ids": list(ids),
+                "chunk_keys": {chunk_id: self.chunk_keys[chunk_id] for chunk_id in ids if chunk_id in self.chunk_keys}
+            })
+
+    def remove_source(self, source):
+        with self.lock:
+            self.load()
+            self._drop_source(source)
+            self._journal({"op": "drop", "source": source})
+
+    def remove(self, ids):
+        with self.lock:
+            self.load()
+            self._apply_remove(ids)
+            self._journal({"op": "remove", "ids": list(ids)})
+
+    def clear(self):
+        with self.lock:
+            self.keys = {}
+            self.chunk_keys = {}
+            self.sources = {}
+            self.chunk_sources = {}
+            self.loaded = True
+            self.save()
+
+    def _drop_source(self, source):
+        for chunk_id in self.sources.pop(source, []):
+            self._remove_chunk(chunk_id)
+
+    def lookup(self, question, limit=5):
+        """Chunk ids for the single provision a question names, or [] if it names none or several.
+
+        Without a detected act the match must come from one source: a number
+        found in several documents is left to hybrid retrieval. limit=None
+        returns every matching id.
+        """
+        citations = parse_question(question)
+        if len(citations) != 1:
+            return []
+        act, kind, number, subsection = citations[0]
+        # A named act also matches documents whose act could not be detected,
+        # but never a different act
+        acts = [act, UNKNOWN_ACT] if act else [ANY_ACT]
+        with self.lock:
+            self.load()
+            for act_key in acts:
+                for sub in ([subsection, ""] if subsection else [""]):
+                    ids = self.keys.get(citation_key(act_key, kind, number, sub))
+                    if not ids:
+                        continue
+                    if act_key != act and len({self.chunk_sources.get(i) for i in ids}) > 1:
+                        return []
+                    return ids[:limit] if limit else list(ids)
+        return []
+
+    def load(self):
+        """Load the snapshot and replay the journal (once)"""
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") != INDEX_VERSION:
+                    # Left empty: LexoraAI.citation_index() rebuilds it, which replaces the journal too
+                    return
+                self.sources = data.get("sources", {})
+                chunk_keys = data.get("chunk_keys", {})
+                for source, ids in self.sources.items():
+                    for chunk_id in ids:
+                        if chunk_id in chunk_keys:
+                            self._add_chunk(chunk_id, chunk_keys[chunk_id], source)
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        if entry["op"] == "source":
+                            self._apply_source(entry["source"], entry["ids"], entry["chunk_keys"])
+                        elif entry["op"] == "drop":
+                            self._drop_source(entry["source"])
+                        elif entry["op"] == "remove":
+                            self._apply_remove(entry["ids"])
+                        self.journal_entries += 1
+
+    def save(self):
+        """Write a full snapshot atomically and truncate the journal"""
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "sources": self.sources, "chunk_keys": self.chunk_keys}, f)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.journal_entries = 0
+
+    def _journal(self, entry):
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.journal_entries += 1
+        if self.journal_entries >= self.compact_every:
+            self.save()
+
+    def rebuild(self, collection, batch_size=1000):
+        """Rebuild from a Chroma collection, ordering each source's chunks by their 'chunk' metadata"""
+        by_source = {}
+        offset = 0
+        while True:
+            batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            for chunk_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                metadata = metadata or {}
+                source = metadata.get("source") or metadata.get("filename") or "unknown"
+                position = metadata.get("chunk", metadata.get("chunk_id", 0))
+                by_source.setdefault(source, []).append((position, chunk_id, text or "", metadata.get("doc_type")))
+            offset += len(batch["ids"])
+
+        with self.lock:
+            self.keys = {}
+            self.chunk_keys = {}
+            self.sources = {}
+            self.chunk_sources = {}
+            self.loaded = True
+            for source, rows in by_source.items():
+                rows.sort(key=lambda row: row[0])
+                self._index_source(
+                    source,
+                    [row[1] for row in rows],
+                    [row[2] for row in rows],
+                    rows[0][3]
+                )
+            self.save()
+
+
+_index = None
+
+def get_citation_index():
+    global _index
+    if _index is None:
+        _index = CitationIndex()
+    return _index
@@ -11,10 +11,131 @@ class Settings(BaseSettings):
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "postgres")
     DB_NAME: str = os.getenv("DB_NAME", "lexora_db")
+    # Full URL override, e.g. sqlite:///./lexora.db for local runs
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
     
     # ChromaDB Configuration
     CHROMA_PATH: str = "./chromadb_data"
     
+    # Ollama Configuration
+    OLLAMA_URL: str = os.getenv("OLLAMA_URL", "http://localhost:11434")
+    OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "mistral")
+    OLLAMA_TIMEOUT: float = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    OLLAMA_MAX_CONCURRENCY: int = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+    OLLAMA_MAX_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "16"))
+    OLLAMA_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OLLAMA_KEEPALIVE_CONNECTIONS", "8"))
+    
+    # Ingestion job queue
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./uploads")
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_PROCESS_WORKERS: int = int(os.getenv("INGEST_PROCESS_WORKERS", "2"))
+    INGEST_MAX_RETRIES: int = int(os.getenv("INGEST_MAX_RETRIES", "2"))
+    INGEST_RETRY_BACKOFF: float = float(os.getenv("INGEST_RETRY_BACKOFF", "2"))
+    INGEST_JOB_HISTORY: int = int(os.getenv("INGEST_JOB_HISTORY", "500"))
+    
+    # PDF extraction (0 workers = one per CPU core)
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+    
+    # Embedding cache
+    EMBED_CACHE_ENABLED: bool = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+    EMBED_CACHE_PATH: str = os.getenv("EMBED_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+    EMBED_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+    
+    # Answer cache
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_SIMILARITY: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+    
+    # Hybrid BM25 + vector retrieval
+    HYBRID_RETRIEVAL: bool = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "3"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    LEXICAL_INDEX_PATH: str = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index/bm25.json")
+    LEXICAL_INDEX_COMPACT_EVERY: int = int(os.getenv("LEXICAL_INDEX_COMPACT_EVERY", "200"))
+    
+    # Citation index (direct provision lookups)
+    CITATION_FAST_PATH: bool = os.getenv("CITATION_FAST_PATH", "true").lower() == "true"
+    CITATION_INDEX_PATH: str = os.getenv("CITATION_INDEX_PATH", "./lexical_index/citations.json")
+    CITATION_INDEX_COMPACT_EVERY: int = int(os.getenv("CITATION_INDEX_COMPACT_EVERY", "200"))
+    
+    # Cross-encoder reranking
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_TOP_K: int = int(os.getenv("RERANK_TOP_K", "3"))
+    RERANK_BUDGET_MS: float = float(os.getenv("RERANK_BUDGET_MS", "150"))
+    RERANK_MAX_LENGTH: int = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+    
+    # Deletion / maintenance
+    DELETE_BATCH_SIZE: int = int(os.getenv("DELETE_BATCH_SIZE", "500"))
+    COMPACT_BATCH_SIZE: int = int(os.getenv("COMPACT_BATCH_SIZE", "1000"))
+    
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE: str = os.getenv("LOG_FILE", "")
+    
+    # Query log write-behind buffer
+    QUERY_LOG_ENABLED: bool = os.getenv("QUERY_LOG_ENABLED", "true").lower() == "true"
+    QUERY_LOG_BATCH_SIZE: int = int(os.getenv("QUERY_LOG_BATCH_SIZE", "200"))
+    QUERY_LOG_FLUSH_INTERVAL: float = float(os.getenv("QUERY_LOG_FLUSH_INTERVAL", "2.0"))
+    QUERY_LOG_BUFFER_MAX: int = int(os.getenv("QUERY_LOG_BUFFER_MAX", "10000"))
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", "0"))  # 0 = CPU count
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+    
+    # LLM backends: ollama | llamacpp | hf
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "ollama")
+    LLM_THREADS: int = int(os.getenv("LLM_THREADS", "0"))  # 0 = CPU count
+    LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", "256"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "120"))
+    LLAMACPP_MODEL_PATH: str = os.getenv("LLAMACPP_MODEL_PATH", "./models/indian_legal_assitant-q6_k.gguf")
+    LLAMACPP_N_GPU_LAYERS: int = int(os.getenv("LLAMACPP_N_GPU_LAYERS", "0"))
+    LLAMACPP_N_CTX: int = int(os.getenv("LLAMACPP_N_CTX", "2048"))
+    LLAMACPP_N_BATCH: int = int(os.getenv("LLAMACPP_N_BATCH", "512"))
+    LLAMACPP_MAX_CONCURRENCY: int = int(os.getenv("LLAMACPP_MAX_CONCURRENCY", "1"))
+    HF_MODEL: str = os.getenv("HF_MODEL", "google/gemma-3-1b-it")
+    HF_ADAPTER_PATH: str = os.getenv("HF_ADAPTER_PATH", "")
+    HF_MAX_INPUT_TOKENS: int = int(os.getenv("HF_MAX_INPUT_TOKENS", "1024"))
+    HF_MAX_CONCURRENCY: int = int(os.getenv("HF_MAX_CONCURRENCY", "1"))
+    HF_BATCH_SIZE: int = int(os.getenv("HF_BATCH_SIZE", "8"))  # 1 = no micro-batching
+    HF_BATCH_WINDOW_MS: float = float(os.getenv("HF_BATCH_WINDOW_MS", "20"))
+    HF_BATCH_LENGTH_RATIO: float = float(os.getenv("HF_BATCH_LENGTH_RATIO", "2.0"))
+    
+    # Context packing (token budget for retrieved text in prompts)
+    OLLAMA_NUM_CTX: int = int(os.getenv("OLLAMA_NUM_CTX", "2048"))  # matches num_ctx in the Modelfile
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))  # 0 = whatever the window leaves
+    CONTEXT_ANSWER_TOKENS: int = int(os.getenv("CONTEXT_ANSWER_TOKENS", "512"))
+    CONTEXT_MARGIN_TOKENS: int = int(os.getenv("CONTEXT_MARGIN_TOKENS", "32"))
+    CONTEXT_MIN_PARTIAL_TOKENS: int = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "48"))
+    CONTEXT_TOKENIZER: str = os.getenv("CONTEXT_TOKENIZER", "")  # HF tokenizer for Ollama models
+    CONTEXT_CHARS_PER_TOKEN: float = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+    CONTEXT_MIN_OVERLAP_CHARS: int = int(os.getenv("CONTEXT_MIN_OVERLAP_CHARS", "20"))
+    CONTEXT_MAX_OVERLAP_CHARS: int = int(os.getenv("CONTEXT_MAX_OVERLAP_CHARS", "250"))
+    
+    # Generation admission control (per backend)
+    GEN_MAX_IN_FLIGHT: int = int(os.getenv("GEN_MAX_IN_FLIGHT", "0"))  # 0 = the backend's concurrency limit
+    GEN_QUEUE_SIZE: int = int(os.getenv("GEN_QUEUE_SIZE", "32"))
+    GEN_BATCH_QUEUE_SIZE: int = int(os.getenv("GEN_BATCH_QUEUE_SIZE", "8"))
+    GEN_INTERACTIVE_QUEUE_TIMEOUT: float = float(os.getenv("GEN_INTERACTIVE_QUEUE_TIMEOUT", "15"))
+    GEN_BATCH_QUEUE_TIMEOUT: float = float(os.getenv("GEN_BATCH_QUEUE_TIMEOUT", "60"))
+    GEN_DEFAULT_SECONDS: float = float(os.getenv("GEN_DEFAULT_SECONDS", "10"))
+    
+    # Startup / warmup
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+    WARMUP_LLM: bool = os.getenv("WARMUP_LLM", "true").lower() == "true"
+    WARMUP_REQUIRED_FOR_READY: bool = os.getenv("WARMUP_REQUIRED_FOR_READY", "false").lower() == "true"
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,193 @@
+"""
+Token-budget context packing for grounded prompts.
+
+Replaces slicing the joined chunks at a fixed character count. Chunks are
+ranked by score, text already present in a selected neighbour (the
+splitter's chunk overlap) is removed, and chunks are added until the token
+budget is spent; the chunk that does not fit is cut at a sentence boundary
+instead of mid-word. Adjacent chunks of the same source are re-joined
+into one passage.
+
+    budget = context_budget(llm.max_prompt_tokens(512), llm.count_tokens(template))
+    packed = pack_context(source_chunks, budget, llm.count_tokens)
+    prompt = build_prompt(packed["text"])
+
+Tokens are counted with the target model's tokenizer when one is available
+(see llm_backends); otherwise CONTEXT_TOKENIZER, else ~CONTEXT_CHARS_PER_TOKEN
+characters per token.
+"""
+import logging
+import math
+import re
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+|\n+")
+PASSAGE_SEPARATOR = "\n\n"
+
+_reference_tokenizer = None
+_reference_failed = False
+_tokenizer_lock = threading.Lock()
+
+
+# ============= TOKEN COUNTING =============
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / settings.CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+def get_reference_tokenizer():
+    """HF tokenizer named by CONTEXT_TOKENIZER, or None (then tokens are estimated)"""
+    global _reference_tokenizer, _reference_failed
+    if _reference_tokenizer is None and settings.CONTEXT_TOKENIZER and not _reference_failed:
+        with _tokenizer_lock:
+            if _reference_tokenizer is None and not _reference_failed:
+                try:
+                    from transformers import AutoTokenizer
+                    _reference_tokenizer = AutoTokenizer.from_pretrained(settings.CONTEXT_TOKENIZER)
+                except Exception as e:
+                    logger.warning("Could not load %s, estimating tokens: %s", settings.CONTEXT_TOKENIZER, e)
+                    _reference_failed = True
+    return _reference_tokenizer
+
+def count_tokens(text):
+    """Tokens in `text` by the reference tokenizer, else the chars-per-token estimate"""
+    tokenizer = get_reference_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+def context_budget(max_prompt_tokens, fixed_tokens):
+    """Tokens left for context once the prompt template and a safety margin are paid for"""
+    budget = max_prompt_tokens - fixed_tokens - settings.CONTEXT_MARGIN_TOKENS
+    if settings.CONTEXT_TOKEN_BUDGET:
+        budget = min(budget, settings.CONTEXT_TOKEN_BUDGET)
+    return max(0, budget)
+
+
+# ============= PACKING =============
+
+def rank_chunks(chunks):
+    """Best first: rerank score, else fused score, else vector distance, else as given"""
+    for key, sign in (("rerank_score", -1), ("score", -1), ("distance", 1)):
+        if chunks and all(chunk.get(key) is not None for chunk in chunks):
+            return sorted(chunks, key=lambda chunk: sign * chunk[key])
+    return list(chunks)
+
+def overlap_length(left, right):
+    """Longest k (within the configured bounds) such that left ends with right[:k]"""
+    longest = min(len(left), len(right), settings.CONTEXT_MAX_OVERLAP_CHARS)
+    for k in range(longest, settings.CONTEXT_MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+def strip_overlaps(text, selected):
+    """Drop text already covered by selected chunks; returns (text, chars removed)"""
+    original = len(text)
+    for other in selected:
+        if text in other:
+            return "", original
+        head = overlap_length(other, text)
+        if head:
+            text = text[head:]
+        tail = overlap_length(text, other)
+        if tail:
+            text = text[:-tail]
+    text = text.strip()
+    return text, original - len(text)
+
+def trim_to_tokens(text, budget, count):
+    """Longest prefix of whole sentences that fits in `budget` tokens ("" if none does)"""
+    if count(text) <= budget:
+        return text
+    ends = [match.start() for match in SENTENCE_END.finditer(text)]
+    best = ""
+    low, high = 0, len(ends) - 1
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = text[:ends[mid]].rstrip()
+        if count(candidate) <= budget:
+            best = candidate
+            low = mid + 1
+        else:
+            high = mid - 1
+    return best
+
+def _position(chunk):
+    metadata = chunk.get("metadata") or {}
+    if metadata.get("source") is None or metadata.get("chunk") is None:
+        return None
+    return metadata["source"], metadata["chunk"]
+
+def _passages(selected):
+    """Re-join chunks that are neighbours in the same source; passages keep best-first order.
+
+    A chunk cut to fit the budget stands alone, since its end no longer meets its neighbour.
+    """
+    passages = []
+    by_position = {}
+    for chunk, text, whole in selected:
+        position = _position(chunk) if whole else None
+        passage = None
+        if position is not None:
+            source, index = position
+            passage = by_position.get((source, index - 1))
+            if passage is not None:
+                passage.append(text)
+            else:
+                passage = by_position.get((source, index + 1))
+                if passage is not None:
+                    passage.insert(0, text)
+        if passage is None:
+            passage = [text]
+            passages.append(passage)
+        if position is not None:
+            by_position[position] = passage
+    # The splitter strips whitespace at chunk edges, so neighbours meet at a space
+    return [" ".join(passage) for passage in passages]
+
+def pack_context(chunks, budget, count=None):
+    """Fill `budget` tokens with the best chunks.
+
+    `chunks` are retrieval results ({"text", "metadata", score keys}) or
+    plain strings. Returns {"text", "tokens", "budget", "chunks", "trimmed",
+    "dropped", "overlap_chars"}.
+    """
+    count = count or count_tokens
+    ranked = rank_chunks([chunk if isinstance(chunk, dict) else {"text": chunk} for chunk in chunks])
+    separator_tokens = count(PASSAGE_SEPARATOR)
+    selected = []
+    used = trimmed = dropped = overlap_chars = 0
+
+    for chunk in ranked:
+        whole = True
+        text, removed = strip_overlaps((chunk.get("text") or "").strip(), [text for _, text, _ in selected])
+        overlap_chars += removed
+        if not text:
+            continue
+        remaining = budget - used - (separator_tokens if selected else 0)
+        tokens = count(text)
+        if tokens > remaining:
+            # Only worth cutting when a meaningful piece still fits
+            text = trim_to_tokens(text, remaining, count) if remaining >= settings.CONTEXT_MIN_PARTIAL_TOKENS else ""
+            if not text:
+                dropped += 1
+                continue
+            tokens = count(text)
+            trimmed += 1
+            whole = False
+        selected.append((chunk, text, whole))
+        used += tokens + (separator_tokens if len(selected) > 1 else 0)
+
+    return {
+        "text": PASSAGE_SEPARATOR.join(_passages(selected)),
+        "tokens": used,
+        "budget": budget,
+        "chunks": len(selected),
+        "trimmed": trimmed,
+        "dropped": dropped,
+        "overlap_chars": overlap_chars
+    }
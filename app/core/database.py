@@ -1,18 +1,42 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.models.db_models import Base
 from app.core.config import settings
+from app.core.resources import resources
 import os
 
-# PostgreSQL connection URL
-DATABASE_URL = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+# Async drivers for request handlers, sync drivers for worker threads
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+SYNC_DRIVERS = {"postgresql": "postgresql", "sqlite": "sqlite"}
+
+def _with_driver(url, drivers):
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    return f"{drivers.get(dialect, scheme)}://{rest}"
+
+def _pool_options(url):
+    # SQLite uses a single-file pool; sizing options only apply to server databases
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
+# PostgreSQL by default; DATABASE_URL overrides (e.g. sqlite:///./lexora.db for local runs)
+DATABASE_URL = settings.DATABASE_URL or f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+SYNC_DATABASE_URL = _with_driver(DATABASE_URL, SYNC_DRIVERS)
+ASYNC_DATABASE_URL = _with_driver(DATABASE_URL, ASYNC_DRIVERS)
 
 # Create engine
 engine = create_engine(
-    DATABASE_URL,
+    SYNC_DATABASE_URL,
     echo=False,
-    pool_size=10,
-    max_overflow=20
+    **_pool_options(SYNC_DATABASE_URL)
 )
 
 # Session factory
@@ -22,9 +46,67 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine shared by all request handlers
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    **_pool_options(ASYNC_DATABASE_URL)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Table metadata created by init_db (main.py adds its auth tables)
+SCHEMAS = [Base.metadata]
+
+# Columns added to tables that existing deployments already have; create_all
+# only creates missing tables, so these are added by upgrade_schema()
+ADDED_COLUMNS = {
+    "documents": ["doc_type", "content_hash", "chunk_hashes", "chunk_count", "updated_at"],
+    "query_logs": ["timings", "cached"],
+}
+
+# Indexes on those tables, created if missing
+ADDED_INDEXES = {
+    "documents": ["ix_documents_content_hash", "ix_documents_uploaded_at"],
+    "query_logs": ["ix_query_logs_created_at"],
+}
+
+def upgrade_schema():
+    """Idempotently add ADDED_COLUMNS and ADDED_INDEXES to existing tables"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name in set(ADDED_COLUMNS) | set(ADDED_INDEXES):
+            if not inspector.has_table(table_name):
+                continue
+            table = Base.metadata.tables[table_name]
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for name in ADDED_COLUMNS.get(table_name, []):
+                if name in existing:
+                    continue
+                column = table.c[name]
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(dialect=engine.dialect)}"
+                ))
+                # Backfill scalar defaults so existing rows read like new ones
+                if column.default is not None and column.default.is_scalar:
+                    conn.execute(text(f"UPDATE {table_name} SET {name} = :value"), {"value": column.default.arg})
+            indexes = {index.name: index for index in table.indexes}
+            for name in ADDED_INDEXES.get(table_name, []):
+                indexes[name].create(bind=conn, checkfirst=True)
+
 # Create all tables
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    for metadata in SCHEMAS:
+        metadata.create_all(bind=engine)
+    upgrade_schema()
+
+# Registered here, ahead of Chroma and LexoraAI, so the schema is built first on startup
+resources.register("database", init_db, startup=True)
 
 # Dependency for routes
 def get_db():
@@ -33,3 +115,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Request-scoped async session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def close_db():
+    """Dispose both pools - call on app shutdown"""
+    await async_engine.dispose()
+    engine.dispose()
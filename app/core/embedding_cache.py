@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+
+
+def normalize_text(text):
+    """Collapse whitespace so re-extracted text with different spacing hits the cache"""
+    return " ".join(text.split())
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (model name, normalized text hash).
+
+    Backed by SQLite so it is shared by the API process, ingestion worker
+    processes and the standalone scripts. Least recently used entries are
+    evicted once the cache grows past `max_entries`.
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or settings.EMBED_CACHE_PATH
+        self.max_entries = max_entries or settings.EMBED_CACHE_MAX_ENTRIES
+        self._local = threading.local()
+        self._puts_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, model, hashes):
+        """Return {text_hash: vector} for the hashes present in the cache"""
+        if not hashes:
+            return {}
+        conn = self._connect()
+        found = {}
+        unique = list(set(hashes))
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *batch]
+            ).fetchall()
+            for h, blob in rows:
+                found[h] = array("f", blob).tolist()
+        if found:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found]
+                )
+        return found
+
+    def put_many(self, model, items):
+        """Store {text_hash: vector} entries"""
+        if not items:
+            return
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, h, array("f", vector).tobytes(), now) for h, vector in items.items()]
+            )
+        self._puts_since_evict += len(items)
+        if self._puts_since_evict >= max(1, self.max_entries // 100):
+            self._puts_since_evict = 0
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries above the size cap"""
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            with conn:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+
+    def embed(self, model, texts, encode_fn):
+        """Embed texts, only calling encode_fn for texts not in the cache.
+
+        encode_fn takes a list of strings and returns one vector per string.
+        Returns a list of float lists aligned with texts.
+        """
+        hashes = [text_hash(text) for text in texts]
+        cached = self.get_many(model, hashes)
+
+        missing = {}
+        for text, h in zip(texts, hashes):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        # Only visible on /metrics when embedding runs in the API process
+        CACHE_REQUESTS.inc(len(texts) - len(missing), cache="embedding", result="hit")
+        CACHE_REQUESTS.inc(len(missing), cache="embedding", result="miss")
+
+        if missing:
+            vectors = encode_fn(list(missing.values()))
+            fresh = {h: [float(x) for x in vector] for h, vector in zip(missing, vectors)}
+            self.put_many(model, fresh)
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    def stats(self):
+        conn = self._connect()
+        entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+_cache = None
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
+
+def cached_embed(model, texts, encode_fn):
+    """Embed texts through the shared on-disk cache"""
+    if not settings.EMBED_CACHE_ENABLED:
+        return [[float(x) for x in vector] for vector in encode_fn(list(texts))]
+    return get_embedding_cache().embed(model, texts, encode_fn)
@@ -0,0 +1,181 @@
+"""
+Admission control for LLM generation.
+
+Each backend gets one scheduler. At most `max_in_flight` generations run
+at once; the rest wait in a priority queue (interactive before batch, FIFO
+within a priority). A full queue is rejected immediately with a 429, and a
+request that waits longer than its priority's queue deadline gets a 503.
+Both carry a Retry-After estimated from recent generation times. Accepted
+requests therefore see a bounded queue wait instead of everyone slowing
+down together.
+
+    async with scheduler_for(backend).slot("interactive"):
+        answer = await backend.generate(prompt)
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+GENERATION_ADMISSIONS = registry.counter(
+    "lexora_generation_admissions_total", "Generation requests by priority and outcome"
+)
+GENERATION_QUEUE_SECONDS = registry.histogram(
+    "lexora_generation_queue_seconds", "Time spent waiting for a generation slot"
+)
+
+
+class GenerationRejected(Exception):
+    """Base for requests turned away by the scheduler"""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GenerationQueueFull(GenerationRejected):
+    status_code = 429
+
+
+class GenerationQueueTimeout(GenerationRejected):
+    status_code = 503
+
+
+class GenerationScheduler:
+    def __init__(self, name, max_in_flight):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        # Moving average of how long a slot is held, for Retry-After
+        self.avg_seconds = None
+
+    def queued(self, priority=None):
+        """Live waiters, optionally only those of one priority"""
+        rank = PRIORITIES.get(priority)
+        return sum(
+            1 for p, _, future in self.waiters
+            if not future.done() and (rank is None or p == rank)
+        )
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up, at least 1"""
+        per_slot = self.avg_seconds or settings.GEN_DEFAULT_SECONDS
+        return max(1, math.ceil(per_slot * (self.queued() + 1) / self.max_in_flight))
+
+    def check(self, priority="interactive"):
+        """Raise GenerationQueueFull now if `priority` would be rejected.
+
+        Batch requests get a shorter queue so they are shed before interactive ones.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (choose from {', '.join(PRIORITIES)})")
+        if self.in_flight < self.max_in_flight and not self.queued():
+            return
+        limit = settings.GEN_QUEUE_SIZE if priority == "interactive" else settings.GEN_BATCH_QUEUE_SIZE
+        if self.queued() >= limit:
+            GENERATION_ADMISSIONS.inc(backend=self.name, priority=priority, result="rejected")
+            raise GenerationQueueFull(
+                f"Too many {priority} requests waiting for the {self.name} model, please retry shortly",
+                self.retry_after()
+            )
+
+    async def acquire(self, priority="interactive", timeout=None, timings=None):
+        self.check(priority)
+        start = time.perf_counter()
+        if self.in_flight < self.max_in_flight and not self.queued():
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiters, (PRIORITIES[priority], next(self.sequence), future))
+            if timeout is None:
+                timeout = (
+                    settings.GEN_INTERACTIVE_QUEUE_TIMEOUT if priority == "interactive"
+                    else settings.GEN_BATCH_QUEUE_TIMEOUT
+                )
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                # release() may have handed over the slot just as the deadline
+                # passed; the request then holds it and is admitted after all
+                if not (future.done() and not future.cancelled()):
+                    GENERATION_ADMISSIONS.inc(backend=self.name, priority=priority, result="timeout")
+                    raise GenerationQueueTimeout(
+                        f"Waited {timeout:.0f}s for the {self.name} model, please retry shortly",
+                        self.retry_after()
+                    ) from None
+            except asyncio.CancelledError:
+                # Slot handed over just as the caller went away
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+        GENERATION_ADMISSIONS.inc(backend=self.name, priority=priority, result="admitted")
+        waited = time.perf_counter() - start
+        GENERATION_QUEUE_SECONDS.observe(waited, backend=self.name, priority=priority)
+        if timings is not None:
+            timings["queue"] = round(waited * 1000, 2)
+
+    def release(self, held_seconds=None):
+        self.in_flight -= 1
+        if held_seconds is not None:
+            self.avg_seconds = held_seconds if self.avg_seconds is None else 0.8 * self.avg_seconds + 0.2 * held_seconds
+        # Hand the freed slot to the best live waiter
+        while self.waiters and self.in_flight < self.max_in_flight:
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority="interactive", timeout=None, timings=None):
+        """Hold one generation slot for the duration of the block.
+
+        The queue wait (ms) is stored under "queue" if a timings dict is passed.
+        """
+        await self.acquire(priority, timeout, timings)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": {name: self.queued(name) for name in PRIORITIES},
+            "avg_seconds": round(self.avg_seconds, 3) if self.avg_seconds is not None else None
+        }
+
+
+_schedulers = {}
+
+def scheduler_for(backend):
+    """The scheduler in front of an LLM backend, sized to its concurrency limit"""
+    if backend.name not in _schedulers:
+        _schedulers[backend.name] = GenerationScheduler(
+            backend.name, settings.GEN_MAX_IN_FLIGHT or backend.max_concurrency
+        )
+    return _schedulers[backend.name]
+
+@registry.collector
+def scheduler_metrics():
+    return [
+        ("lexora_generation_in_flight", "gauge", "Generations holding a slot",
+         [({"backend": s.name}, s.in_flight) for s in _schedulers.values()]),
+        ("lexora_generation_queued", "gauge", "Generations waiting for a slot",
+         [({"backend": s.name, "priority": name}, s.queued(name))
+          for s in _schedulers.values() for name in PRIORITIES]),
+    ]
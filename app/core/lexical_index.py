@@ -0,0 +1,211 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from app.core.config import settings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in",
+    "is", "it", "its", "of", "on", "or", "that", "the", "to", "was", "were",
+    "what", "which", "who", "will", "with", "this", "these", "those", "shall"
+}
+
+
+def tokenize(text):
+    """Lowercased alphanumeric tokens; keeps citation tokens like '49a' or '243zd' whole"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """In-process BM25 inverted index over stored chunks.
+
+    Persisted as a JSON snapshot plus an append-only journal of add/remove
+    operations, so each ingest only appends what changed. The journal is
+    folded into the snapshot once it grows past `compact_every` entries.
+    """
+
+    def __init__(self, path=None, k1=1.5, b=0.75, compact_every=None):
+        self.path = path or settings.LEXICAL_INDEX_PATH
+        self.journal_path = self.path + ".log"
+        self.k1 = k1
+        self.b = b
+        self.compact_every = compact_every or settings.LEXICAL_INDEX_COMPACT_EVERY
+        self.lock = threading.RLock()
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.doc_types = {}
+        self.total_length = 0
+        self.journal_entries = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    # ============= MUTATION =============
+
+    def _add(self, chunk_id, text, doc_type):
+        if chunk_id in self.doc_terms:
+            self._remove(chunk_id)
+        counts = Counter(tokenize(text))
+        self.doc_terms[chunk_id] = dict(counts)
+        self.doc_lengths[chunk_id] = sum(counts.values())
+        self.doc_types[chunk_id] = doc_type
+        self.total_length += self.doc_lengths[chunk_id]
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+
+    def _remove(self, chunk_id):
+        terms = self.doc_terms.pop(chunk_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(chunk_id, 0)
+        self.doc_types.pop(chunk_id, None)
+
+    def add(self, ids, texts, doc_types):
+        """Index chunks (re-indexing ids that are already present)"""
+        with self.lock:
+            self.load()
+            for chunk_id, text, doc_type in zip(ids, texts, doc_types):
+                self._add(chunk_id, text, doc_type)
+            self._journal({"op": "add", "ids": list(ids), "texts": list(texts), "doc_types": list(doc_types)})
+
+    def remove(self, ids):
+        with self.lock:
+            self.load()
+            for chunk_id in ids:
+                self._remove(chunk_id)
+            self._journal({"op": "remove", "ids": list(ids)})
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            self.doc_terms = {}
+            self.doc_lengths = {}
+            self.doc_types = {}
+            self.total_length = 0
+            self.loaded = True
+            self.save()
+
+    # ============= SEARCH =============
+
+    def search(self, query, k=10, doc_type=None):
+        """Return [(chunk_id, bm25_score)] best first"""
+        with self.lock:
+            self.load()
+            n_docs = len(self.doc_lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self.total_length / n_docs
+            scores = {}
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for chunk_id, tf in posting.items():
+                    if doc_type and self.doc_types.get(chunk_id) != doc_type:
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    # ============= PERSISTENCE =============
+
+    def load(self):
+        """Load the snapshot and replay the journal (once)"""
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                for chunk_id, terms in snapshot["doc_terms"].items():
+                    self.doc_terms[chunk_id] = terms
+                    self.doc_lengths[chunk_id] = sum(terms.values())
+                    self.doc_types[chunk_id] = snapshot["doc_types"].get(chunk_id)
+                    self.total_length += self.doc_lengths[chunk_id]
+                    for term, tf in terms.items():
+                        self.postings.setdefault(term, {})[chunk_id] = tf
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        if entry["op"] == "add":
+                            for chunk_id, text, doc_type in zip(entry["ids"], entry["texts"], entry["doc_types"]):
+                                self._add(chunk_id, text, doc_type)
+                        elif entry["op"] == "remove":
+                            for chunk_id in entry["ids"]:
+                                self._remove(chunk_id)
+                        self.journal_entries += 1
+
+    def save(self):
+        """Write a full snapshot atomically and truncate the journal"""
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"doc_terms": self.doc_terms, "doc_types": self.doc_types}, f)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.journal_entries = 0
+
+    def _journal(self, entry):
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.journal_entries += 1
+        if self.journal_entries >= self.compact_every:
+            self.save()
+
+    def rebuild(self, collection, batch_size=1000):
+        """Rebuild the whole index from the documents stored in a Chroma collection"""
+        with self.lock:
+            self.postings = {}
+            self.doc_terms = {}
+            self.doc_lengths = {}
+            self.doc_types = {}
+            self.total_length = 0
+            self.loaded = True
+            offset = 0
+            while True:
+                batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+                if not batch["ids"]:
+                    break
+                for chunk_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                    self._add(chunk_id, text or "", (metadata or {}).get("doc_type", "general"))
+                offset += len(batch["ids"])
+            self.save()
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse several ranked id lists; returns [(id, score)] best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+_index = None
+
+def get_lexical_index():
+    global _index
+    if _index is None:
+        _index = LexicalIndex()
+    return _index
@@ -1,65 +1,309 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+from app.core.answer_cache import answer_cache
 from app.core.chromadb_manager import chroma_db_manager
-from PyPDF2 import PdfReader
+from app.core.citation_index import get_citation_index
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.embedding_cache import cached_embed
+from app.core.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from app.core.metrics import observe_stage, stage_timer
+from app.core.reranker import get_reranker
+from app.core.resources import resources
+from app.models.db_models import Document
+from app.services import chunk_catalog, corpus_stats
+from app.services.pdf_extraction import extract_pdf_text
+from chromadb.utils import embedding_functions
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+logger = logging.getLogger(__name__)
+
+_embedding_function = None
+
+# Chroma's DefaultEmbeddingFunction model; also the embedding cache namespace
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+# ============= INGESTION STAGES =============
+# Module-level so they can be shipped to worker processes.
+
+def split_text(text, chunk_size=500, overlap=100):
+    """Split text into overlapping chunks"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=overlap,
+        separators=["\n\n", "\n", " ", ""]
+    )
+    return splitter.split_text(text)
+
+def get_embedding_function():
+    global _embedding_function
+    if _embedding_function is None:
+        _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    return _embedding_function
+
+def embed_chunks(chunks):
+    """Embed chunks with the same model Chroma uses by default, through the embedding cache"""
+    return cached_embed(EMBEDDING_MODEL, chunks, get_embedding_function())
+
+
+# ============= CONTENT HASHING =============
+
+def file_sha256(file_path):
+    """SHA-256 of a file's bytes, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_ids(source, hashes):
+    """Content-addressed chunk ids; repeated chunks in one source get a counter"""
+    seen = {}
+    ids = []
+    for h in hashes:
+        n = seen.get(h, 0)
+        seen[h] = n + 1
+        ids.append(f"{source}:{h[:16]}" if n == 0 else f"{source}:{h[:16]}:{n}")
+    return ids
+
 
 class LexoraAI:
+    _write_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize LexoraAI using the SINGLE ChromaDB instance"""
         self.client = chroma_db_manager.get_client()
-        self.collection = chroma_db_manager.get_collection()
+        self.ensure_catalog()
+    
+    @property
+    def collection(self):
+        # Looked up each time: a full clear or a compaction replaces the collection
+        return chroma_db_manager.get_collection()
     
     def has_documents(self):
         """Check if collection has documents"""
         return self.collection.count() > 0
     
-    def process_pdf_document(self, file_path, doc_type="general", chunk_size=500, overlap=100):
-        """Process and store PDF chunks with doc_type metadata - FIXED"""
-        print(f"\n--- process_pdf_document called ---")
-        print(f"  file_path: {file_path}")
-        print(f"  doc_type: '{doc_type}'")
+    def process_pdf_document(self, file_path, doc_type="general", chunk_size=500, overlap=100, source=None):
+        """Process and store PDF chunks with doc_type metadata.
         
-        reader = PdfReader(file_path)
-        text = "\n".join([page.extract_text() for page in reader.pages])
+        Unchanged files are skipped; edited files only re-embed changed chunks.
+        """
+        source = source or file_path
+        logger.debug("process_pdf_document file_path=%s doc_type=%s", file_path, doc_type)
         
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=overlap,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        with stage_timer("hash"):
+            file_hash = file_sha256(file_path)
+        if self.is_unchanged(source, file_hash, doc_type):
+            logger.info("%s unchanged since last ingest - skipped", source)
+            return self.skipped_result(source)
         
-        chunks = splitter.split_text(text)
-        print(f"  Created {len(chunks)} chunks")
-        
-        ids = [f"{file_path}_chunk_{idx}" for idx in range(len(chunks))]
-        metadatas = [
-            {
-                "source": file_path,
-                "doc_type": doc_type,
-                "chunk": idx,
-                "total_chunks": len(chunks)
-            }
-            for idx in range(len(chunks))
-        ]
-        
-        print(f"  First metadata: {metadatas[0]}")
-        
-        self.collection.add(
-            ids=ids,
-            documents=chunks,
-            metadatas=metadatas
-        )
+        with stage_timer("extract"):
+            text = extract_pdf_text(file_path)
+        with stage_timer("split"):
+            chunks = split_text(text, chunk_size=chunk_size, overlap=overlap)
+        logger.debug("%s: created %d chunks", source, len(chunks))
         
-        print(f"  Stored in ChromaDB")
-        print(f"--- end process_pdf_document ---\n")
+        return self.store_chunks(source, chunks, doc_type=doc_type, file_hash=file_hash)
+    
+    def is_unchanged(self, source, file_hash, doc_type="general"):
+        """True if this exact file was already indexed for source with the same doc_type"""
+        db = SessionLocal()
+        try:
+            doc = db.query(Document).filter(Document.filename == source).first()
+            return bool(
+                doc and doc.indexed
+                and doc.content_hash == file_hash
+                and doc.doc_type == doc_type
+            )
+        finally:
+            db.close()
+    
+    def plan_chunks(self, source, chunks, doc_type="general"):
+        """Diff chunks against what is already indexed for source.
+        
+        Returns the content-addressed ids, the indices of chunks that need
+        embedding, and the ids of stale chunks to delete.
+        """
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        ids = chunk_ids(source, hashes)
         
-        return len(chunks)
+        db = SessionLocal()
+        try:
+            doc = db.query(Document).filter(Document.filename == source).first()
+            tracked = doc is not None and doc.chunk_hashes is not None
+            old_ids = chunk_ids(source, doc.chunk_hashes) if tracked else []
+            old_doc_type = doc.doc_type if doc else None
+        finally:
+            db.close()
+        
+        old_positions = {chunk_id: idx for idx, chunk_id in enumerate(old_ids)}
+        new_ids = set(ids)
+        return {
+            "source": source,
+            "doc_type": doc_type,
+            "tracked": tracked,
+            "hashes": hashes,
+            "ids": ids,
+            "new": [idx for idx, chunk_id in enumerate(ids) if chunk_id not in old_positions],
+            "stale_ids": [chunk_id for chunk_id in old_ids if chunk_id not in new_ids],
+            "moved": [
+                idx for idx, chunk_id in enumerate(ids)
+                if chunk_id in old_positions and (
+                    old_positions[chunk_id] != idx
+                    or len(old_ids) != len(ids)
+                    or old_doc_type != doc_type
+                )
+            ]
+        }
     
-    def query(self, question, doc_type=None, n_chunks=5):
-        """Query with optional doc_type metadata filter"""
+    def store_chunks(self, source, chunks, doc_type="general", embeddings=None, file_hash=None, plan=None):
+        """Store chunks incrementally in ChromaDB and record them in the Document table.
+        
+        `embeddings`, if given, must line up with plan["new"]; otherwise new
+        chunks are embedded here through the embedding cache. Only new chunks
+        are added; stale ones are deleted and moved ones get fresh metadata.
+        """
+        with self._write_lock:
+            current = self.plan_chunks(source, chunks, doc_type)
+            plan_changed = plan is None or plan["new"] != current["new"]
+            plan = current
+            if plan["new"] and (embeddings is None or plan_changed):
+                with stage_timer("embed"):
+                    embeddings = embed_chunks([chunks[idx] for idx in plan["new"]])
+            # "store" covers the writes only; embedding is timed above
+            write_start = time.perf_counter()
+            ids = plan["ids"]
+            
+            def metadata(idx):
+                return {
+                    "source": source,
+                    "doc_type": doc_type,
+                    "chunk": idx,
+                    "total_chunks": len(chunks),
+                    "chunk_hash": plan["hashes"][idx]
+                }
+            
+            lexical = self.lexical_index()
+            removed_ids = list(plan["stale_ids"])
+            
+            if not plan["tracked"]:
+                # Drop chunks stored for this source before ingestion was content-addressed
+                # (the old bulk loader keyed them by "filename" under a shared source)
+                untracked = self.collection.get(
+                    where={"$or": [{"source": {"$eq": source}}, {"filename": {"$eq": source}}]},
+                    include=[]
+                )
+                if untracked['ids']:
+                    self.collection.delete(ids=untracked['ids'])
+                    lexical.remove(untracked['ids'])
+                    self.citation_index().remove(untracked['ids'])
+                    removed_ids.extend(untracked['ids'])
+            
+            if plan["stale_ids"]:
+                self.collection.delete(ids=plan["stale_ids"])
+                lexical.remove(plan["stale_ids"])
+            
+            if plan["new"]:
+                self.collection.add(
+                    ids=[ids[idx] for idx in plan["new"]],
+                    documents=[chunks[idx] for idx in plan["new"]],
+                    metadatas=[metadata(idx) for idx in plan["new"]],
+                    embeddings=embeddings
+                )
+            
+            if plan["moved"]:
+                self.collection.update(
+                    ids=[ids[idx] for idx in plan["moved"]],
+                    metadatas=[metadata(idx) for idx in plan["moved"]]
+                )
+            
+            # New chunks, plus moved ones in case their doc_type changed
+            reindex = plan["new"] + plan["moved"]
+            if reindex:
+                lexical.add(
+                    [ids[idx] for idx in reindex],
+                    [chunks[idx] for idx in reindex],
+                    [doc_type] * len(reindex)
+                )
+            
+            if plan["new"] or plan["stale_ids"] or plan["moved"] or not plan["tracked"]:
+                self.citation_index().replace_source(source, ids, chunks, doc_type)
+            
+            self._record_document(
+                source, doc_type, file_hash, plan["hashes"],
+                added=[(ids[idx], idx, chunks[idx]) for idx in plan["new"]],
+                moved=[(ids[idx], idx) for idx in plan["moved"]],
+                removed_ids=removed_ids
+            )
+            
+            if plan["new"] or plan["stale_ids"] or plan["moved"] or not plan["tracked"]:
+                answer_cache.invalidate()
+            observe_stage("store", time.perf_counter() - write_start)
+        
+        result = {
+            "source": source,
+            "skipped": False,
+            "chunks": len(chunks),
+            "added": len(plan["new"]),
+            "removed": len(plan["stale_ids"]),
+            "unchanged": len(chunks) - len(plan["new"])
+        }
+        logger.info("%s: %d chunks added, %d removed, %d unchanged",
+                    source, result['added'], result['removed'], result['unchanged'])
+        return result
+    
+    def _record_document(self, source, doc_type, file_hash, hashes, added=(), moved=(), removed_ids=()):
+        """Upsert the Document row and apply chunk catalog changes in one transaction"""
+        db = SessionLocal()
+        try:
+            chunk_catalog.remove_chunks(db, list(removed_ids))
+            chunk_catalog.add_chunks(db, source, doc_type, list(added))
+            chunk_catalog.move_chunks(db, doc_type, list(moved))
+            
+            doc = db.query(Document).filter(Document.filename == source).first()
+            if doc is None:
+                doc = Document(filename=source)
+                db.add(doc)
+            doc.doc_type = doc_type
+            doc.content_hash = file_hash
+            doc.chunk_hashes = hashes
+            doc.chunk_count = len(hashes)
+            doc.chromadb_id = source
+            doc.indexed = True
+            doc.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+    
+    def skipped_result(self, source):
+        db = SessionLocal()
+        try:
+            doc = db.query(Document).filter(Document.filename == source).first()
+            count = doc.chunk_count if doc else 0
+        finally:
+            db.close()
+        return {"source": source, "skipped": True, "chunks": count, "added": 0, "removed": 0, "unchanged": count}
+    
+    def query(self, question, doc_type=None, n_chunks=5, rerank=None):
+        """Query with optional doc_type metadata filter.
+        
+        With reranking on, RERANK_CANDIDATES chunks are retrieved and only the
+        best min(n_chunks, RERANK_TOP_K) by cross-encoder score are kept.
+        """
+        if rerank is None:
+            rerank = settings.RERANK_ENABLED
         source_chunks = []
         using_documents = False
         answer = ""
+        timings = {}
         
         if self.has_documents():
             where_filter = None
@@ -67,24 +311,26 @@ class LexoraAI:
                 where_filter = {"doc_type": {"$eq": doc_type}}
             
             try:
-                results = self.collection.query(
-                    query_texts=[question],
-                    n_results=n_chunks,
-                    where=where_filter
-                )
-                
-                if results['documents'] and len(results['documents'][0]) > 0:
-                    using_documents = True
-                    source_chunks = [
-                        {
-                            "text": results['documents'][0][i],
-                            "metadata": results['metadatas'][0][i],
-                            "distance": float(results['distances'][0][i])
-                        }
-                        for i in range(len(results['documents'][0]))
-                    ]
+                retrieve_start = time.perf_counter()
+                source_chunks = []
+                if settings.CITATION_FAST_PATH:
+                    source_chunks = self.lookup_provision(question, doc_type, n_chunks)
+                if not source_chunks and rerank:
+                    reranker = get_reranker()
+                    top_k = min(n_chunks, settings.RERANK_TOP_K)
+                    candidates = self.retrieve(
+                        question, where_filter, doc_type,
+                        max(n_chunks, reranker.candidate_limit(top_k))
+                    )
+                    source_chunks = reranker.rerank(question, candidates, top_k)
+                elif not source_chunks:
+                    source_chunks = self.retrieve(question, where_filter, doc_type, n_chunks)
+                retrieve_seconds = time.perf_counter() - retrieve_start
+                observe_stage("retrieve", retrieve_seconds)
+                timings["retrieve"] = round(retrieve_seconds * 1000, 2)
+                using_documents = len(source_chunks) > 0
             except Exception as e:
-                print(f"Query error: {e}")
+                logger.exception("Query error: %s", e)
                 using_documents = False
         
         if using_documents:
@@ -96,11 +342,234 @@ class LexoraAI:
         return {
             "answer": answer,
             "using_documents": using_documents,
-            "source_chunks": source_chunks
+            "source_chunks": source_chunks,
+            "timings": timings
         }
     
-    def clear_documents(self):
-        """Clear all documents"""
-        all_docs = self.collection.get()
-        if all_docs['ids']:
-            self.collection.delete(ids=all_docs['ids'])
+    def retrieve(self, question, where_filter=None, doc_type=None, n_chunks=5):
+        """Vector search, fused with BM25 results via reciprocal-rank fusion when hybrid is on"""
+        hybrid = settings.HYBRID_RETRIEVAL
+        n_candidates = n_chunks * settings.HYBRID_CANDIDATES if hybrid else n_chunks
+        
+        results = self.collection.query(
+            query_embeddings=embed_chunks([question]),
+            n_results=n_candidates,
+            where=where_filter
+        )
+        
+        vector_hits = {}
+        if results['ids'] and results['ids'][0]:
+            for i, chunk_id in enumerate(results['ids'][0]):
+                vector_hits[chunk_id] = {
+                    "text": results['documents'][0][i],
+                    "metadata": results['metadatas'][0][i],
+                    "distance": float(results['distances'][0][i])
+                }
+        
+        if not hybrid:
+            return list(vector_hits.values())[:n_chunks]
+        
+        lexical_hits = self.lexical_index().search(question, k=n_candidates, doc_type=doc_type)
+        fused = reciprocal_rank_fusion(
+            [list(vector_hits), [chunk_id for chunk_id, _ in lexical_hits]],
+            k=settings.RRF_K
+        )[:n_chunks]
+        
+        # Lexical-only hits still need their text and metadata
+        missing = [chunk_id for chunk_id, _ in fused if chunk_id not in vector_hits]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+                vector_hits[chunk_id] = {"text": text, "metadata": metadata, "distance": None}
+        
+        source_chunks = []
+        for chunk_id, score in fused:
+            hit = vector_hits.get(chunk_id)
+            if hit is not None:
+                source_chunks.append({**hit, "score": round(score, 6)})
+        return source_chunks
+    
+    def lookup_provision(self, question, doc_type=None, n_chunks=5):
+        """Fast path: fetch the chunks of the provision a question cites, skipping ANN search"""
+        if not doc_type:
+            chunk_ids = self.citation_index().lookup(question, limit=n_chunks)
+        else:
+            # Filter the full match list by doc_type before cutting it to n_chunks
+            chunk_ids = self.citation_index().lookup(question, limit=None)
+            if chunk_ids:
+                matching = set(self.collection.get(
+                    ids=chunk_ids, where={"doc_type": {"$eq": doc_type}}, include=[]
+                )['ids'])
+                chunk_ids = [chunk_id for chunk_id in chunk_ids if chunk_id in matching][:n_chunks]
+        if not chunk_ids:
+            return []
+        fetched = self.collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: {"text": text, "metadata": metadata, "distance": None, "match": "citation"}
+            for chunk_id, text, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas'])
+        }
+        return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+    
+    def ensure_catalog(self):
+        """Backfill the chunk catalog from the collection if it is empty but the collection is not.
+        
+        Covers corpora stored before the catalog existed or written outside
+        LexoraAI. The corpus counters are rebuilt with it, and on their own if
+        they disagree with the catalog (e.g. it was filled before they existed).
+        """
+        with self._write_lock:
+            if self.collection.count() == 0:
+                return
+            db = SessionLocal()
+            try:
+                if chunk_catalog.is_empty(db):
+                    logger.info("Backfilling chunk catalog from %d stored chunks", self.collection.count())
+                    chunk_catalog.backfill_from_collection(db, self.collection)
+                elif corpus_stats.get_totals(db)["chunks"] != chunk_catalog.catalog_size(db):
+                    logger.info("Rebuilding corpus counters from the chunk catalog")
+                    corpus_stats.rebuild(db)
+                    db.commit()
+            finally:
+                db.close()
+    
+    def citation_index(self):
+        """The citation index, built from the collection on first use if missing"""
+        index = get_citation_index()
+        with index.lock:
+            index.load()
+            if not index.sources and self.collection.count() > 0:
+                logger.info("Building citation index from %d stored chunks", self.collection.count())
+                index.rebuild(self.collection)
+        return index
+    
+    def lexical_index(self):
+        """The BM25 index, built from the collection on first use if missing"""
+        index = get_lexical_index()
+        with index.lock:
+            index.load()
+            if len(index) == 0 and self.collection.count() > 0:
+                logger.info("Building lexical index from %d stored chunks", self.collection.count())
+                index.rebuild(self.collection)
+        return index
+    
+    def clear_documents(self, doc_type=None):
+        """Clear all documents, or only those of one doc_type; returns chunks removed"""
+        if doc_type:
+            return self.delete_documents(doc_type=doc_type)
+        
+        with self._write_lock:
+            removed = self.collection.count()
+            chroma_db_manager.reset_collection()
+            self._reset_indexes()
+        answer_cache.invalidate()
+        return removed
+    
+    def reset_indexes(self):
+        """Empty the BM25 and citation indexes, the chunk catalog and Document hashes, leaving ChromaDB as is.
+        
+        For bulk rebuilds, which load every file into a staging collection and swap it in.
+        """
+        with self._write_lock:
+            self._reset_indexes()
+    
+    def _reset_indexes(self):
+        get_lexical_index().clear()
+        get_citation_index().clear()
+        self._forget_documents()
+    
+    def delete_source(self, source, doc_type=None):
+        """Delete every chunk of one source document; returns chunks removed"""
+        return self.delete_documents(doc_type=doc_type, source=source)
+    
+    def delete_documents(self, doc_type=None, source=None, batch_size=None):
+        """Delete chunks matching doc_type and/or source in bounded batches.
+        
+        Ids come from the chunk catalog; a where-filtered sweep afterwards
+        catches chunks that were stored without a catalog row (e.g. by
+        chromadb_upload.py).
+        """
+        batch_size = batch_size or settings.DELETE_BATCH_SIZE
+        conditions = []
+        if doc_type:
+            conditions.append({"doc_type": {"$eq": doc_type}})
+        if source:
+            conditions.append({"source": {"$eq": source}})
+        where = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else None)
+        
+        removed_ids = []
+        with self._write_lock:
+            db = SessionLocal()
+            try:
+                for ids in chunk_catalog.iter_chunk_ids(db, doc_type=doc_type, source=source, batch_size=batch_size):
+                    self._delete_ids(db, ids)
+                    removed_ids.extend(ids)
+                
+                while True:
+                    leftover = self.collection.get(where=where, include=[], limit=batch_size)
+                    if not leftover['ids']:
+                        break
+                    self._delete_ids(db, leftover['ids'])
+                    removed_ids.extend(leftover['ids'])
+            finally:
+                db.close()
+                # One citation index update for the whole delete, not one per batch
+                if removed_ids:
+                    self.citation_index().remove(removed_ids)
+            self._forget_documents(doc_type=doc_type, source=source)
+        removed = len(removed_ids)
+        
+        if removed:
+            answer_cache.invalidate()
+        logger.info("Deleted %d chunks (doc_type=%s, source=%s)", removed, doc_type, source)
+        return removed
+    
+    def _delete_ids(self, db, ids):
+        self.collection.delete(ids=ids)
+        self.lexical_index().remove(ids)
+        chunk_catalog.remove_chunks(db, ids)
+        db.commit()
+    
+    def _forget_documents(self, doc_type=None, source=None):
+        """Mark Document rows as no longer indexed so the next upload re-ingests them.
+        
+        With no filter this is a full clear, so the chunk catalog is emptied too.
+        """
+        db = SessionLocal()
+        try:
+            if not doc_type and not source:
+                chunk_catalog.clear_chunks(db)
+            query = db.query(Document)
+            if doc_type:
+                query = query.filter(Document.doc_type == doc_type)
+            if source:
+                query = query.filter(Document.filename == source)
+            query.update(
+                {Document.indexed: False, Document.chunk_hashes: None, Document.chunk_count: 0},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+# ============= LAZY RESOURCES =============
+# Built on first use or on app startup - never at import time.
+
+def _init_chroma():
+    return chroma_db_manager.initialize(
+        db_path=settings.CHROMA_PATH,
+        collection_name="crpc_chapters_chunked"
+    )
+
+resources.register("chroma", _init_chroma, startup=True)
+resources.register("embedding_model", get_embedding_function, warm=lambda embed: embed(["warmup"]))
+if settings.RERANK_ENABLED:
+    resources.register(
+        "reranker", get_reranker,
+        warm=lambda reranker: reranker.get_model().predict([("warmup", "warmup")])
+    )
+resources.register("lexora", LexoraAI, depends=("chroma", "database"), startup=True)
+
+def get_lexora():
+    """The shared LexoraAI instance"""
+    return resources.get("lexora")
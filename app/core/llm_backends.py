@@ -0,0 +1,422 @@
+"""
+Pluggable LLM backends behind one interface.
+
+    backend = get_backend()            # settings.LLM_BACKEND
+    text = await backend.generate(prompt, options=SUMMARY_OPTIONS)
+    async for token in get_backend("llamacpp").stream(prompt):
+        ...
+
+Options use Ollama's names (temperature, top_k, top_p, num_predict, stop)
+and are translated for the in-process backends. Each backend has its own
+concurrency limit; the in-process ones run generation in a worker thread
+and stream tokens back to the event loop through a queue.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from app.core.batch_generator import BatchGenerator
+from app.core.config import settings
+from app.core.context_packer import count_tokens
+from app.core.llm_client import ollama_client
+from app.core.metrics import record_generation
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class LLMBackendError(Exception):
+    """Raised for unknown, unavailable or failing backends"""
+
+
+def cpu_threads():
+    """Threads for in-process inference: LLM_THREADS, else every core"""
+    return settings.LLM_THREADS or os.cpu_count() or 1
+
+
+class LLMBackend:
+    """Interface every backend implements"""
+
+    name = None
+
+    def __init__(self, max_concurrency=1):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._semaphore = None
+
+    def get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def available(self):
+        """True if the backend's dependencies and model files are present"""
+        return True
+
+    def loaded(self):
+        return True
+
+    def context_window(self):
+        """Tokens the model attends to (prompt plus answer)"""
+        raise NotImplementedError
+
+    def max_prompt_tokens(self, answer_tokens):
+        return self.context_window() - answer_tokens
+
+    def count_tokens(self, text):
+        """Tokens in `text` for this model; estimated when its tokenizer isn't at hand"""
+        return count_tokens(text)
+
+    async def generate(self, prompt, options=None, timeout=None):
+        raise NotImplementedError
+
+    async def stream(self, prompt, options=None, timeout=None):
+        raise NotImplementedError
+        yield
+
+    def close(self):
+        pass
+
+    def info(self):
+        return {
+            "name": self.name,
+            "available": self.available(),
+            "loaded": self.loaded(),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight
+        }
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama over HTTP; the shared client already limits concurrency"""
+
+    name = "ollama"
+
+    def __init__(self):
+        super().__init__(settings.OLLAMA_MAX_CONCURRENCY)
+
+    def get_semaphore(self):
+        return ollama_client.get_semaphore()
+
+    def context_window(self):
+        return settings.OLLAMA_NUM_CTX
+
+    async def generate(self, prompt, options=None, timeout=None):
+        self.in_flight += 1
+        try:
+            return await ollama_client.generate(prompt, options=options, timeout=timeout)
+        finally:
+            self.in_flight -= 1
+
+    async def stream(self, prompt, options=None, timeout=None):
+        self.in_flight += 1
+        try:
+            async for token in ollama_client.stream_generate(prompt, options=options, timeout=timeout):
+                yield token
+        finally:
+            self.in_flight -= 1
+
+
+class LocalBackend(LLMBackend):
+    """Base for models loaded into this process.
+
+    Subclasses implement `load()` and `stream_sync(prompt, options, cancelled)`,
+    a blocking token generator that stops once `cancelled` is set.
+    """
+
+    def __init__(self, max_concurrency=1):
+        super().__init__(max_concurrency)
+        self.model = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        raise NotImplementedError
+
+    def get_model(self):
+        if self.model is None:
+            with self.lock:
+                if self.model is None:
+                    start = time.perf_counter()
+                    self.model = self.load()
+                    logger.info("Loaded %s backend in %.1fs", self.name, time.perf_counter() - start)
+        return self.model
+
+    def loaded(self):
+        return self.model is not None
+
+    def close(self):
+        self.model = None
+
+    def stream_sync(self, prompt, options, cancelled):
+        raise NotImplementedError
+
+    def generate_sync(self, prompt, options=None):
+        """Blocking generation for scripts and worker threads"""
+        return "".join(self.stream_sync(prompt, options or {}, threading.Event()))
+
+    async def generate(self, prompt, options=None, timeout=None):
+        tokens = []
+        async for token in self.stream(prompt, options, timeout):
+            tokens.append(token)
+        return "".join(tokens)
+
+    async def stream(self, prompt, options=None, timeout=None):
+        """Run stream_sync in a thread and hand tokens to the event loop.
+
+        Closing the generator early (client gone, timeout) sets the cancel
+        flag, which ends generation after the current token.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+        deadline = loop.time() + (timeout or settings.LLM_TIMEOUT)
+
+        def produce():
+            tokens = 0
+            start = time.perf_counter()
+            try:
+                for token in self.stream_sync(prompt, options or {}, cancelled):
+                    tokens += 1
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+                    if cancelled.is_set():
+                        break
+                record_generation(self.name, tokens, time.perf_counter() - start)
+                loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        async with self.get_semaphore():
+            self.in_flight += 1
+            worker = loop.run_in_executor(None, produce)
+            try:
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError(f"{self.name} generation timed out")
+                    item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    if item is _DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise LLMBackendError(f"{self.name} generation failed: {item}") from item
+                    yield item
+            finally:
+                cancelled.set()
+                self.in_flight -= 1
+                # Keep the slot until the thread has stopped using the model
+                await asyncio.gather(worker, return_exceptions=True)
+
+
+class LlamaCppBackend(LocalBackend):
+    """GGUF model through llama-cpp-python (the legal assistant by default)"""
+
+    name = "llamacpp"
+
+    def __init__(self, model_path=None):
+        super().__init__(settings.LLAMACPP_MAX_CONCURRENCY)
+        self.model_path = model_path or settings.LLAMACPP_MODEL_PATH
+
+    def available(self):
+        try:
+            import llama_cpp  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.exists(self.model_path)
+
+    def context_window(self):
+        return settings.LLAMACPP_N_CTX
+
+    def count_tokens(self, text):
+        # The GGUF vocabulary is only available once the model is loaded
+        if self.model is None:
+            return count_tokens(text)
+        return len(self.model.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def load(self):
+        try:
+            from llama_cpp import Llama
+        except ImportError as e:
+            raise LLMBackendError("llama-cpp-python is not installed") from e
+        return Llama(
+            model_path=self.model_path,
+            n_gpu_layers=settings.LLAMACPP_N_GPU_LAYERS,
+            n_ctx=settings.LLAMACPP_N_CTX,
+            n_batch=settings.LLAMACPP_N_BATCH,
+            n_threads=cpu_threads(),
+            verbose=False
+        )
+
+    def stream_sync(self, prompt, options, cancelled):
+        chunks = self.get_model().create_completion(
+            prompt,
+            max_tokens=options.get("num_predict", settings.LLM_MAX_TOKENS),
+            temperature=options.get("temperature", 0.7),
+            top_k=options.get("top_k", 40),
+            top_p=options.get("top_p", 0.95),
+            stop=options.get("stop") or [],
+            stream=True
+        )
+        try:
+            for chunk in chunks:
+                if cancelled.is_set():
+                    break
+                text = chunk["choices"][0]["text"]
+                if text:
+                    yield text
+        finally:
+            chunks.close()
+
+
+class HFGemmaBackend(LocalBackend):
+    """Gemma 3 through transformers, with the fine-tuned adapter weights if configured.
+
+    With HF_BATCH_SIZE > 1, concurrent prompts are decoded together by a
+    BatchGenerator; otherwise each prompt runs its own `model.generate`.
+    """
+
+    name = "hf"
+
+    def __init__(self, model_name=None, adapter_path=None):
+        # Enough slots to fill a batch
+        super().__init__(max(settings.HF_MAX_CONCURRENCY, settings.HF_BATCH_SIZE))
+        self.model_name = model_name or settings.HF_MODEL
+        self.adapter_path = settings.HF_ADAPTER_PATH if adapter_path is None else adapter_path
+        self.device = None
+        self.batcher = None
+        self.tokenizer = None
+
+    def available(self):
+        try:
+            import torch  # noqa: F401
+            import transformers  # noqa: F401
+        except ImportError:
+            return False
+        return not self.adapter_path or os.path.exists(self.adapter_path)
+
+    def context_window(self):
+        return settings.HF_MAX_INPUT_TOKENS + settings.LLM_MAX_TOKENS
+
+    def max_prompt_tokens(self, answer_tokens):
+        # Inputs are truncated to HF_MAX_INPUT_TOKENS; the answer has its own limit
+        return settings.HF_MAX_INPUT_TOKENS
+
+    def get_tokenizer(self):
+        """The model's tokenizer, loaded on its own so counting never loads the weights"""
+        if self.tokenizer is None:
+            with self.lock:
+                if self.tokenizer is None:
+                    from transformers import AutoTokenizer
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        return self.tokenizer
+
+    def count_tokens(self, text):
+        return len(self.get_tokenizer()(text, add_special_tokens=False)["input_ids"])
+
+    def load(self):
+        import torch
+        from transformers import AutoTokenizer, Gemma3ForCausalLM
+
+        torch.set_num_threads(cpu_threads())
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        tokenizer = self.tokenizer or AutoTokenizer.from_pretrained(self.model_name)
+        self.tokenizer = tokenizer
+        model = Gemma3ForCausalLM.from_pretrained(self.model_name, torch_dtype=torch.bfloat16)
+        if self.adapter_path:
+            from safetensors.torch import load_file
+            model.load_state_dict(load_file(self.adapter_path, device="cpu"), strict=False)
+        model.to(self.device)
+        model.eval()
+        if settings.HF_BATCH_SIZE > 1:
+            self.batcher = BatchGenerator(tokenizer, model, self.device)
+        return tokenizer, model
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+        super().close()
+
+    def stream_sync(self, prompt, options, cancelled):
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        class Cancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return cancelled.is_set()
+
+        tokenizer, model = self.get_model()
+        if self.batcher is not None:
+            yield from self.batcher.submit(prompt, options, cancelled)
+            return
+
+        inputs = tokenizer(
+            prompt, return_tensors="pt", truncation=True, max_length=settings.HF_MAX_INPUT_TOKENS
+        ).to(self.device)
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        temperature = options.get("temperature", 0.7)
+        kwargs = dict(
+            inputs,
+            max_new_tokens=options.get("num_predict", settings.LLM_MAX_TOKENS),
+            do_sample=temperature > 0,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([Cancelled()])
+        )
+        if temperature > 0:
+            kwargs.update(temperature=temperature, top_k=options.get("top_k", 50), top_p=options.get("top_p", 1.0))
+
+        errors = []
+
+        def run():
+            try:
+                with torch.inference_mode():
+                    model.generate(**kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            cancelled.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+
+
+BACKENDS = {
+    "ollama": OllamaBackend,
+    "llamacpp": LlamaCppBackend,
+    "hf": HFGemmaBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name=None):
+    """The shared instance of a backend (settings.LLM_BACKEND by default)"""
+    name = name or settings.LLM_BACKEND
+    if name not in BACKENDS:
+        raise LLMBackendError(f"Unknown LLM backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name not in _backends:
+        with _backends_lock:
+            if name not in _backends:
+                _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+def backends_info():
+    return {
+        "default": settings.LLM_BACKEND,
+        "backends": [get_backend(name).info() for name in BACKENDS]
+    }
+
+def close_backends():
+    """Release in-process models - call on app shutdown"""
+    for backend in _backends.values():
+        backend.close()
+    _backends.clear()
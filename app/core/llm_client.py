@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import record_generation
+
+
+class OllamaError(Exception):
+    """Raised when Ollama answers with a non-200 status"""
+
+    def __init__(self, status_code, detail=""):
+        super().__init__(f"Ollama HTTP {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class OllamaClient:
+    """Shared async Ollama client - ONE keep-alive connection pool across app"""
+
+    _instance = None
+    _client = None
+    _semaphore = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def get_client(self):
+        """Get (or lazily create) the pooled httpx client"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=settings.OLLAMA_URL,
+                limits=httpx.Limits(
+                    max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OLLAMA_KEEPALIVE_CONNECTIONS
+                ),
+                timeout=self._timeout(settings.OLLAMA_TIMEOUT)
+            )
+        return self._client
+
+    def get_semaphore(self):
+        """Limit the number of generations in flight against Ollama"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.OLLAMA_MAX_CONCURRENCY)
+        return self._semaphore
+
+    def _timeout(self, read_timeout):
+        return httpx.Timeout(
+            read_timeout,
+            connect=settings.OLLAMA_CONNECT_TIMEOUT
+        )
+
+    def _payload(self, prompt, model=None, options=None, stream=False):
+        return {
+            "model": model or settings.OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options or {}
+        }
+
+    async def generate(self, prompt, model=None, options=None, timeout=None):
+        """Run one non-streaming generation and return the response text.
+
+        Raises httpx.TimeoutException on timeout and OllamaError on HTTP errors.
+        """
+        client = self.get_client()
+        async with self.get_semaphore():
+            response = await client.post(
+                "/api/generate",
+                json=self._payload(prompt, model, options),
+                timeout=self._timeout(timeout or settings.OLLAMA_TIMEOUT)
+            )
+
+        if response.status_code != 200:
+            raise OllamaError(response.status_code, response.text)
+
+        data = response.json()
+        self._record(data)
+        return data.get("response", "")
+
+    def _record(self, final_chunk, tokens=0, seconds=0.0):
+        """Tokens/sec from Ollama's eval counters, else from what we counted"""
+        eval_count = final_chunk.get("eval_count")
+        eval_duration = final_chunk.get("eval_duration")
+        if eval_count and eval_duration:
+            record_generation("ollama", eval_count, eval_duration / 1e9)
+        else:
+            record_generation("ollama", tokens, seconds)
+
+    async def stream_generate(self, prompt, model=None, options=None, timeout=None):
+        """Stream a generation, yielding response tokens as Ollama emits them.
+
+        Closing the generator early closes the HTTP stream, which makes
+        Ollama abort the generation.
+        """
+        client = self.get_client()
+        tokens = 0
+        first_token_at = None
+        async with self.get_semaphore():
+            async with client.stream(
+                "POST",
+                "/api/generate",
+                json=self._payload(prompt, model, options, stream=True),
+                timeout=self._timeout(timeout or settings.OLLAMA_TIMEOUT)
+            ) as response:
+                if response.status_code != 200:
+                    detail = (await response.aread()).decode(errors="replace")
+                    raise OllamaError(response.status_code, detail)
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaError(response.status_code, chunk["error"])
+                    token = chunk.get("response", "")
+                    if token:
+                        tokens += 1
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        yield token
+                    if chunk.get("done"):
+                        elapsed = time.perf_counter() - first_token_at if first_token_at else 0.0
+                        self._record(chunk, tokens, elapsed)
+                        break
+
+    async def close(self):
+        """Close the connection pool - call on app shutdown"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+# Global instance
+ollama_client = OllamaClient()
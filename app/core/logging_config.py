@@ -0,0 +1,52 @@
+"""
+Non-blocking, leveled logging.
+
+Request handlers only enqueue log records (QueueHandler); a QueueListener
+thread formats them and does the actual I/O, so a slow stdout or log file
+never stalls the event loop.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+
+from app.core.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener = None
+
+
+def setup_logging(level=None):
+    """Route the root logger through a queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [stream]
+    if settings.LOG_FILE:
+        file_handler = logging.handlers.RotatingFileHandler(
+            settings.LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=3, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level or settings.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records - call on app shutdown"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,169 @@
+"""
+Storage maintenance for the ChromaDB persist directory.
+
+Deleted vectors are only marked deleted in the HNSW segment, so after heavy
+churn link_lists.bin and friends keep their peak size and searches walk
+dead entries. compact() copies the live records into a fresh collection,
+swaps it in under the original name, VACUUMs chroma.sqlite3 and removes
+segment directories no longer referenced by any collection.
+
+    python -m app.core.maintenance --compact
+"""
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import time
+
+from app.core.chromadb_manager import chroma_db_manager
+from app.core.config import settings
+from app.core.lexical_index import get_lexical_index
+
+logger = logging.getLogger(__name__)
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def copy_collection(source, target, batch_size=None):
+    """Copy every record with its stored embedding; returns the number copied"""
+    batch_size = batch_size or settings.COMPACT_BATCH_SIZE
+    copied = 0
+    while True:
+        batch = source.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=batch_size,
+            offset=copied
+        )
+        if not len(batch["ids"]):
+            break
+        target.add(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"]
+        )
+        copied += len(batch["ids"])
+    return copied
+
+def rebuild_collection(batch_size=None, source=None):
+    """Copy every record of `source` (default: the live collection) into a new collection and give it the live name.
+
+    The live collection is renamed aside, not deleted, until the copy is in
+    place, so an interruption never leaves the corpus only under a temporary name.
+    """
+    batch_size = batch_size or settings.COMPACT_BATCH_SIZE
+    client = chroma_db_manager.get_client()
+    name = chroma_db_manager.get_collection_name()
+    temp_name, old_name = f"{name}__compact", f"{name}__old"
+
+    chroma_db_manager.recover_swap()
+    live = client.get_collection(name=name)
+    source = source or live
+    # Serving HNSW settings, not source.metadata: a collection bulk-loaded with
+    # large hnsw:batch_size / sync_threshold gets the defaults back here
+    target = client.create_collection(name=temp_name, metadata=chroma_db_manager.get_collection_metadata())
+    copied = copy_collection(source, target, batch_size)
+
+    live.modify(name=old_name)
+    try:
+        target.modify(name=name)
+    except Exception:
+        live.modify(name=name)
+        raise
+    chroma_db_manager.reload_collection()
+    client.delete_collection(name=old_name)
+    return copied
+
+def vacuum_sqlite(db_path):
+    """VACUUM chroma.sqlite3; returns False if the file is missing or busy"""
+    sqlite_path = os.path.join(db_path, "chroma.sqlite3")
+    if not os.path.exists(sqlite_path):
+        return False
+    conn = sqlite3.connect(sqlite_path, timeout=30)
+    try:
+        conn.execute("VACUUM")
+        return True
+    except sqlite3.OperationalError as e:
+        logger.warning("VACUUM skipped: %s", e)
+        return False
+    finally:
+        conn.close()
+
+def remove_orphan_segments(db_path):
+    """Delete segment directories that no collection references any more"""
+    sqlite_path = os.path.join(db_path, "chroma.sqlite3")
+    if not os.path.exists(sqlite_path):
+        return []
+    conn = sqlite3.connect(sqlite_path, timeout=30)
+    try:
+        live = {row[0] for row in conn.execute("SELECT id FROM segments")}
+    finally:
+        conn.close()
+
+    removed = []
+    for entry in os.listdir(db_path):
+        path = os.path.join(db_path, entry)
+        # Segment directories are named by segment UUID
+        if os.path.isdir(path) and len(entry) == 36 and entry.count("-") == 4 and entry not in live:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(entry)
+    return removed
+
+def compact(batch_size=None):
+    """Rebuild the collection, vacuum its SQLite store and fold the BM25 journal.
+
+    Holds LexoraAI's write lock so no ingest or delete runs concurrently.
+    """
+    # Imported here: LexoraAI pulls in the embedding model
+    from app.core.lexora import LexoraAI
+
+    db_path = chroma_db_manager.get_db_path()
+    start = time.perf_counter()
+    size_before = directory_size(db_path)
+
+    with LexoraAI._write_lock:
+        copied = rebuild_collection(batch_size)
+        vacuumed = vacuum_sqlite(db_path)
+        orphans = remove_orphan_segments(db_path)
+        lexical = get_lexical_index()
+        with lexical.lock:
+            lexical.load()
+            lexical.save()
+
+    size_after = directory_size(db_path)
+    return {
+        "chunks": copied,
+        "vacuumed": vacuumed,
+        "orphan_segments_removed": len(orphans),
+        "bytes_before": size_before,
+        "bytes_after": size_after,
+        "bytes_reclaimed": size_before - size_after,
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compact", action="store_true", help="rebuild and vacuum the ChromaDB store")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.compact:
+        chroma_db_manager.initialize(db_path=settings.CHROMA_PATH)
+        result = compact(args.batch_size)
+        print(
+            f"Compacted {result['chunks']} chunks in {result['seconds']}s: "
+            f"{result['bytes_before']:,} -> {result['bytes_after']:,} bytes "
+            f"({result['orphan_segments_removed']} orphan segments removed)"
+        )
+    else:
+        parser.print_help()
@@ -0,0 +1,167 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms are kept in memory behind one lock and rendered on
+GET /metrics. Callbacks registered with `collector` are evaluated at render
+time, for values that already live elsewhere (cache stats, queue depth).
+
+    with stage_timer("retrieve"):
+        ...
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond cache hits up to multi-minute ingests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"'.replace("\n", " ") for name, value in items)
+    return "{" + body + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, lock):
+        self.name = name
+        self.help = help_text
+        self.lock = lock
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, lock, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.lock = lock
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': _format_value(float(bound))})} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = []
+
+    def counter(self, name, help_text):
+        if name not in self.metrics:
+            self.metrics[name] = Counter(name, help_text, self.lock)
+        return self.metrics[name]
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, help_text, self.lock, buckets)
+        return self.metrics[name]
+
+    def collector(self, fn):
+        """Register fn() -> [(name, type, help, [(labels_dict, value)])], evaluated on render"""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in self.metrics.values():
+                lines.extend(metric.render())
+        for fn in self.collectors:
+            try:
+                families = fn()
+            except Exception:
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics the app records
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "lexora_stage_seconds",
+    "Time spent per pipeline stage (extract, split, embed, store, retrieve, prompt_build, generate)"
+)
+STAGE_ERRORS = registry.counter("lexora_stage_errors_total", "Pipeline stages that raised")
+HTTP_SECONDS = registry.histogram("lexora_http_request_seconds", "HTTP request latency by route")
+CACHE_REQUESTS = registry.counter("lexora_cache_requests_total", "Cache lookups by cache and result")
+LLM_TOKENS = registry.counter("lexora_llm_tokens_total", "Tokens generated by the LLM backend")
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    "lexora_llm_tokens_per_second", "LLM decode throughput per generation", buckets=RATE_BUCKETS
+)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """Time a block into lexora_stage_seconds{stage=...}; failures also count as errors.
+
+    If a dict is passed as `timings`, the elapsed milliseconds are also stored
+    under the stage name (for per-request breakdowns such as query logs).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_stage(stage, elapsed)
+        if timings is not None:
+            timings[stage] = round(elapsed * 1000, 2)
+
+def record_generation(backend, tokens, seconds):
+    if tokens:
+        LLM_TOKENS.inc(tokens, backend=backend)
+        if seconds > 0:
+            LLM_TOKENS_PER_SECOND.observe(tokens / seconds, backend=backend)
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Optional cross-encoder rerank stage for retrieved chunks.
+
+    All candidate pairs are scored in one batched forward pass. The number of
+    candidates scored is capped so the expected cost (tracked as a moving
+    average per pair) stays within the latency budget.
+    """
+
+    def __init__(self, model_name=None, budget_ms=None, max_length=None):
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.budget_ms = budget_ms or settings.RERANK_BUDGET_MS
+        self.max_length = max_length or settings.RERANK_MAX_LENGTH
+        self.model = None
+        self.lock = threading.Lock()
+        self.ms_per_pair = None
+
+    def get_model(self):
+        if self.model is None:
+            with self.lock:
+                if self.model is None:
+                    from sentence_transformers import CrossEncoder
+                    self.model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self.model
+
+    def candidate_limit(self, top_k, budget_ms=None):
+        """How many candidates fit in the latency budget (at least top_k)"""
+        budget_ms = budget_ms or self.budget_ms
+        if not self.ms_per_pair:
+            return settings.RERANK_CANDIDATES
+        return max(top_k, min(settings.RERANK_CANDIDATES, int(budget_ms / self.ms_per_pair)))
+
+    def rerank(self, question, chunks, top_k, budget_ms=None):
+        """Return the top_k chunks by cross-encoder score, each with a 'rerank_score'.
+
+        Falls back to the incoming order if the model cannot be loaded or fails.
+        """
+        if len(chunks) <= 1:
+            return chunks[:top_k]
+
+        candidates = chunks[:self.candidate_limit(top_k, budget_ms)]
+        try:
+            model = self.get_model()
+            start = time.perf_counter()
+            scores = model.predict(
+                [(question, chunk["text"]) for chunk in candidates],
+                batch_size=len(candidates),
+                show_progress_bar=False
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            observe_stage("rerank", elapsed_ms / 1000)
+        except Exception as e:
+            logger.warning("Rerank failed, keeping retrieval order: %s", e)
+            return chunks[:top_k]
+
+        per_pair = elapsed_ms / len(candidates)
+        self.ms_per_pair = per_pair if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * per_pair
+
+        ranked = sorted(
+            ({**chunk, "rerank_score": float(score)} for chunk, score in zip(candidates, scores)),
+            key=lambda chunk: chunk["rerank_score"],
+            reverse=True
+        )
+        return ranked[:top_k]
+
+
+_reranker = None
+
+def get_reranker():
+    global _reranker
+    if _reranker is None:
+        _reranker = CrossEncoderReranker()
+    return _reranker
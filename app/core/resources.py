@@ -0,0 +1,153 @@
+"""
+Lazy registry for expensive process-wide resources (database schema, Chroma,
+embedding and reranker models, the LexoraAI facade).
+
+Nothing is built at import time. A resource is created on its first `get`,
+or during `startup()` if it was registered with `startup=True`. `warmup()`
+loads the resources that have a warm function and runs one dummy inference
+through each, then generates one token with the default LLM backend so its
+weights are resident before the first real query.
+
+    resources.register("lexora", LexoraAI, depends=("chroma", "database"), startup=True)
+    lexora = resources.get("lexora")
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PROMPT = "Reply with OK."
+
+
+class ResourceRegistry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.specs = {}
+        self.instances = {}
+        self.load_seconds = {}
+        self.errors = {}
+        self.ready = False
+        self.startup_seconds = None
+        self.warmup_state = "idle"
+        self.warmup_seconds = None
+        self.warmup_task = None
+
+    def register(self, name, factory, depends=(), startup=False, warm=None, close=None):
+        """Register a factory; `warm(instance)` runs a dummy inference, `close(instance)` releases it"""
+        self.specs[name] = {
+            "factory": factory,
+            "depends": tuple(depends),
+            "startup": startup,
+            "warm": warm,
+            "close": close
+        }
+
+    def get(self, name):
+        """Build the resource (and its dependencies) on first use"""
+        if name in self.instances:
+            return self.instances[name]
+        spec = self.specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown resource: {name}")
+        with self.lock:
+            if name in self.instances:
+                return self.instances[name]
+            for dependency in spec["depends"]:
+                self.get(dependency)
+            start = time.perf_counter()
+            try:
+                instance = spec["factory"]()
+            except Exception as e:
+                self.errors[name] = str(e)
+                raise
+            self.load_seconds[name] = round(time.perf_counter() - start, 3)
+            self.errors.pop(name, None)
+            self.instances[name] = instance
+            logger.info("Loaded %s in %.2fs", name, self.load_seconds[name])
+            return instance
+
+    def loaded(self, name):
+        return name in self.instances
+
+    async def startup(self):
+        """Build every startup=True resource in a worker thread, then mark ready"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        for name, spec in list(self.specs.items()):
+            if spec["startup"]:
+                await loop.run_in_executor(None, self.get, name)
+        self.startup_seconds = round(time.perf_counter() - start, 3)
+        self.ready = True
+        logger.info("Resources ready in %.2fs", self.startup_seconds)
+
+    async def warmup(self, llm=True):
+        """Pre-load every warmable resource and run one dummy inference through each"""
+        from app.core.llm_backends import get_backend
+
+        loop = asyncio.get_running_loop()
+        self.warmup_state = "running"
+        start = time.perf_counter()
+        try:
+            for name, spec in list(self.specs.items()):
+                if spec["warm"] is None:
+                    continue
+                try:
+                    instance = await loop.run_in_executor(None, self.get, name)
+                    await loop.run_in_executor(None, spec["warm"], instance)
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    logger.warning("Warmup of %s failed: %s", name, e)
+            if llm:
+                try:
+                    # One token is enough to load the default backend's weights
+                    await get_backend().generate(WARMUP_PROMPT, options={"num_predict": 1})
+                except Exception as e:
+                    self.errors["llm"] = str(e)
+                    logger.warning("LLM warmup failed: %s", e)
+        finally:
+            self.warmup_seconds = round(time.perf_counter() - start, 3)
+        self.warmup_state = "failed" if self.errors else "done"
+        logger.info("Warmup %s in %.2fs", self.warmup_state, self.warmup_seconds)
+
+    def start_warmup(self, llm=True):
+        """Run `warmup` as a background task so startup does not wait for it"""
+        if self.warmup_task is None:
+            self.warmup_state = "pending"
+            self.warmup_task = asyncio.create_task(self.warmup(llm=llm))
+        return self.warmup_task
+
+    async def shutdown(self):
+        """Cancel a running warmup and close loaded resources in reverse load order"""
+        if self.warmup_task is not None:
+            self.warmup_task.cancel()
+            await asyncio.gather(self.warmup_task, return_exceptions=True)
+            self.warmup_task = None
+        self.ready = False
+        for name in reversed(list(self.instances)):
+            close = self.specs[name]["close"]
+            if close is None:
+                continue
+            try:
+                close(self.instances[name])
+            except Exception as e:
+                logger.warning("Closing %s failed: %s", name, e)
+        self.instances.clear()
+
+    def status(self):
+        warming = settings.WARMUP_ON_STARTUP and settings.WARMUP_REQUIRED_FOR_READY
+        return {
+            "ready": self.ready and (not warming or self.warmup_state in ("done", "failed")),
+            "startup_seconds": self.startup_seconds,
+            "warmup": self.warmup_state,
+            "warmup_seconds": self.warmup_seconds,
+            "loaded": dict(self.load_seconds),
+            "errors": dict(self.errors)
+        }
+
+
+# Global instance
+resources = ResourceRegistry()
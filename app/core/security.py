@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.metrics import stage_timer
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so threads spread across cores.
+    At most BCRYPT_MAX_PENDING hashes may be running or queued; beyond that
+    callers get HashingBusy instead of piling up behind a login burst.
+    """
+
+    _instance = None
+    _executor = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.pending = 0
+            cls._instance.lock = threading.Lock()
+        return cls._instance
+
+    def get_executor(self):
+        if self._executor is None:
+            workers = settings.BCRYPT_WORKERS or os.cpu_count() or 2
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, stage, fn, *args):
+        with self.lock:
+            if self.pending >= settings.BCRYPT_MAX_PENDING:
+                raise HashingBusy("Too many sign-in requests in progress, please retry shortly")
+            self.pending += 1
+        try:
+            with stage_timer(stage):
+                return await asyncio.get_running_loop().run_in_executor(self.get_executor(), fn, *args)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    async def hash(self, password):
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+        hashed = await self._run("password_hash", bcrypt.hashpw, password.encode(), salt)
+        return hashed.decode()
+
+    async def verify(self, password, hashed):
+        return await self._run("password_verify", bcrypt.checkpw, password.encode(), hashed.encode())
+
+    def needs_rehash(self, hashed):
+        """True if the stored hash uses a different cost factor than BCRYPT_ROUNDS"""
+        try:
+            return int(hashed.split("$")[2]) != settings.BCRYPT_ROUNDS
+        except (IndexError, ValueError):
+            return False
+
+    def close(self):
+        """Shut the pool down - call on app shutdown"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+password_hasher = PasswordHasher()
@@ -1,32 +1,76 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Measured from the first line so /ready can report how long importing the app took
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
+import asyncio
+import logging
 import os
 
+from app.core.logging_config import setup_logging, shutdown_logging
+
+# Before anything else logs: every record goes through the queue listener
+setup_logging()
+
+from app.core.answer_cache import answer_cache
 from app.core.chromadb_manager import chroma_db_manager
-from app.core.database import init_db, engine
+from app.core.database import SCHEMAS, get_async_db, close_db
 from app.core.config import settings
+from app.core.llm_backends import close_backends
+from app.core.llm_client import ollama_client
+from app.core.metrics import HTTP_SECONDS, registry
+from app.core.resources import resources
+from app.core.security import HashingBusy, password_hasher
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.query_log_writer import query_log_writer
+from app.services import corpus_stats
 from app.routers import api
 
-# Initialize database
-init_db()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="LexoraAI", version="1.0.0")
 
-# ✅ Initialize ChromaDB
-client, collection = chroma_db_manager.initialize(
-    db_path=settings.CHROMA_PATH,
-    collection_name="crpc_chapters_chunked"
-)
-
 app.state.chroma_db_manager = chroma_db_manager
 
+@app.on_event("startup")
+async def startup_services():
+    await ingestion_jobs.start()
+    await query_log_writer.start()
+    # Schema, Chroma and LexoraAI load in the background; /live answers at once,
+    # /ready flips once they are built
+    app.state.resources_task = asyncio.create_task(load_resources())
+
+async def load_resources():
+    try:
+        await resources.startup()
+    except Exception as e:
+        logger.exception("Resource startup failed: %s", e)
+        return
+    if settings.WARMUP_ON_STARTUP:
+        resources.start_warmup(llm=settings.WARMUP_LLM)
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    await ingestion_jobs.stop()
+    await query_log_writer.stop()
+    app.state.resources_task.cancel()
+    await asyncio.gather(app.state.resources_task, return_exceptions=True)
+    await resources.shutdown()
+    close_backends()
+    await ollama_client.close()
+    await close_db()
+    password_hasher.close()
+    shutdown_logging()
+
 # Add CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,10 +80,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============= METRICS =============
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Route template, not the raw path, so job ids don't explode the label set
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+@registry.collector
+def cache_and_queue_metrics():
+    answers = answer_cache.stats()
+    queue = ingestion_jobs.queue
+    return [
+        ("lexora_answer_cache_entries", "gauge", "Entries in the answer cache", [({}, answers["entries"])]),
+        ("lexora_answer_cache_invalidations_total", "counter", "Answer cache invalidations",
+         [({}, answers["invalidations"])]),
+        ("lexora_ingest_queue_depth", "gauge", "Ingestion jobs waiting for a worker",
+         [({}, queue.qsize() if queue is not None else 0)]),
+        ("lexora_import_seconds", "gauge", "Time taken to import the app", [({}, IMPORT_SECONDS)]),
+        ("lexora_resource_load_seconds", "gauge", "Time taken to build each lazy resource",
+         [({"resource": name}, seconds) for name, seconds in resources.load_seconds.items()]),
+    ]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition: stage timers, HTTP latency, caches, LLM tokens/sec"""
+    return registry.render()
+
 # ============= DATABASE SETUP =============
 
 Base = declarative_base()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class User(Base):
     __tablename__ = "users"
@@ -50,8 +129,8 @@ class User(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Created with the app tables by the "database" resource
+SCHEMAS.append(Base.metadata)
 
 # ============= AUTH MODELS =============
 
@@ -70,7 +149,7 @@ class SignInRequest(BaseModel):
 # ============= AUTH ROUTES =============
 
 @app.post("/auth/signup")
-async def signup(data: SignUpRequest):
+async def signup(data: SignUpRequest, db: AsyncSession = Depends(get_async_db)):
     try:
         if data.password != data.confirmPassword:
             raise HTTPException(status_code=400, detail="Passwords do not match")
@@ -78,19 +157,16 @@ async def signup(data: SignUpRequest):
         if len(data.password) < 6:
             raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
         
-        db = SessionLocal()
-        
         # Check if user exists
-        existing = db.query(User).filter(
-            (User.email == data.email) | (User.username == data.username)
-        ).first()
+        existing = (await db.scalars(
+            select(User).where((User.email == data.email) | (User.username == data.username))
+        )).first()
         
         if existing:
-            db.close()
             raise HTTPException(status_code=400, detail="User already exists")
         
-        # Hash password
-        hashed = bcrypt.hashpw(data.password.encode(), bcrypt.gensalt()).decode()
+        # Hash password (off the event loop)
+        hashed = await password_hasher.hash(data.password)
         
         # Create user
         user = User(
@@ -99,8 +175,8 @@ async def signup(data: SignUpRequest):
             password_hash=hashed
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         # Generate token
         token = jwt.encode(
@@ -114,8 +190,6 @@ async def signup(data: SignUpRequest):
             algorithm="HS256"
         )
         
-        db.close()
-        
         return {
             "message": "User created successfully",
             "token": token,
@@ -124,26 +198,29 @@ async def signup(data: SignUpRequest):
     
     except HTTPException:
         raise
+    except HashingBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/auth/signin")
-async def signin(data: SignInRequest):
+async def signin(data: SignInRequest, db: AsyncSession = Depends(get_async_db)):
     try:
-        db = SessionLocal()
-        
         # Find user
-        user = db.query(User).filter(User.email == data.email).first()
+        user = (await db.scalars(select(User).where(User.email == data.email))).first()
         
         if not user:
-            db.close()
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        # Verify password
-        if not bcrypt.checkpw(data.password.encode(), user.password_hash.encode()):
-            db.close()
+        # Verify password (off the event loop)
+        if not await password_hasher.verify(data.password, user.password_hash):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
+        # Upgrade hashes made with an older cost factor
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = await password_hasher.hash(data.password)
+            await db.commit()
+        
         # Generate token
         token = jwt.encode(
             {
@@ -156,8 +233,6 @@ async def signin(data: SignInRequest):
             algorithm="HS256"
         )
         
-        db.close()
-        
         return {
             "message": "Sign in successful",
             "token": token,
@@ -166,6 +241,8 @@ async def signin(data: SignInRequest):
     
     except HTTPException:
         raise
+    except HashingBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -176,13 +253,31 @@ app.include_router(api.router, prefix="/api", tags=["LexoraAI"])
 
 # ============= HEALTH CHECK =============
 
+@app.get("/live")
+def live():
+    """Liveness: the process is up and serving; never touches models or the database"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+def ready():
+    """Readiness: 503 until the database schema, Chroma and LexoraAI are built"""
+    status = resources.status()
+    status["import_seconds"] = IMPORT_SECONDS
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.post("/warmup")
+async def warmup():
+    """Pre-load the embedding (and reranker) models and the LLM in the background"""
+    resources.start_warmup(llm=settings.WARMUP_LLM)
+    return {"warmup": resources.warmup_state}
+
 @app.get("/")
-def health_check():
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     try:
-        collection = chroma_db_manager.get_collection()
+        totals = await db.run_sync(corpus_stats.get_totals)
         return {
             "status": "LexoraAI running",
-            "chromadb_documents": collection.count(),
+            "chromadb_documents": totals["chunks"],
             "chromadb_path": settings.CHROMA_PATH,
             "database": "PostgreSQL connected",
             "db_host": settings.DB_HOST
@@ -192,3 +287,6 @@ def health_check():
             "status": "LexoraAI running",
             "error": str(e)
         }
+
+IMPORT_SECONDS = round(time.perf_counter() - IMPORT_STARTED, 3)
+logger.info("Imported app in %.2fs", IMPORT_SECONDS)
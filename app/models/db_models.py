@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, JSON, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -10,9 +10,54 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), unique=True, index=True)
     content = Column(Text)
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    uploaded_at = Column(DateTime, default=datetime.utcnow, index=True)
     chromadb_id = Column(String(255), nullable=True)
     indexed = Column(Boolean, default=False)
+    doc_type = Column(String(100), default="general")
+    content_hash = Column(String(64), index=True, nullable=True)
+    chunk_hashes = Column(JSON, nullable=True)
+    chunk_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Chunk(Base):
+    """Catalog row for every chunk stored in ChromaDB (no embeddings, preview text only)"""
+    __tablename__ = "chunks"
+    
+    id = Column(Integer, primary_key=True)
+    chunk_id = Column(String(512), unique=True, nullable=False)
+    source = Column(String(255), nullable=False, index=True)
+    doc_type = Column(String(100), default="general", index=True)
+    chunk_number = Column(Integer, default=0)
+    text_preview = Column(String(210))
+    text_length = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_chunks_doc_type_id", "doc_type", "id"),
+        Index("ix_chunks_source_chunk_number", "source", "chunk_number"),
+    )
+
+class CorpusStat(Base):
+    """Running counters for the stored corpus.
+    
+    One row for the whole corpus (doc_type="", source=""), one per doc_type
+    (source="") and one per (doc_type, source) pair. "bytes" is total chunk
+    text length; "documents" counts sources with at least one chunk.
+    """
+    __tablename__ = "corpus_stats"
+    
+    id = Column(Integer, primary_key=True)
+    doc_type = Column(String(100), nullable=False, default="")
+    source = Column(String(255), nullable=False, default="")
+    chunks = Column(Integer, nullable=False, default=0)
+    documents = Column(Integer, nullable=False, default=0)
+    bytes = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("doc_type", "source", name="uq_corpus_stats_doc_type_source"),
+        Index("ix_corpus_stats_source", "source"),
+    )
 
 class QueryLog(Base):
     __tablename__ = "query_logs"
@@ -21,7 +66,9 @@ class QueryLog(Base):
     question = Column(Text)
     answer = Column(Text)
     sources = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    timings = Column(JSON, nullable=True)
+    cached = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
 class User(Base):
     __tablename__ = "users"
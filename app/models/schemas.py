@@ -22,6 +22,8 @@ class QueryLogCreate(BaseModel):
     question: str
     answer: str
     sources: List[dict]
+    timings: Optional[dict] = None
+    cached: bool = False
 
 class QueryLog(QueryLogCreate):
     id: int
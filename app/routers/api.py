@@ -1,24 +1,44 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 import shutil
 import os
-from app.core.lexora import LexoraAI
+import uuid
+from fastapi.concurrency import run_in_threadpool
+from app.core.lexora import get_lexora
 from app.core.chromadb_manager import chroma_db_manager
+from app.core.llm_client import OllamaError
+from app.core.llm_backends import LLMBackendError, backends_info, get_backend
+from app.core.context_packer import context_budget, pack_context
+from app.core.generation_scheduler import PRIORITIES, GenerationRejected, scheduler_for
+from app.core.config import settings
+from app.core.answer_cache import answer_cache
+from app.core.embedding_cache import text_hash
+from app.core import maintenance
+from app.core.metrics import STAGE_ERRORS, observe_stage, stage_timer
+from app.core.security import HashingBusy, password_hasher
+from app.services.ingestion_jobs import ingestion_jobs, IngestionQueueFull
+from app.services import chunk_catalog, corpus_stats
+from app.services.query_log_writer import query_log_writer
+from app.core.database import get_async_db
+import asyncio
+import logging
+import time
 import warnings
-import requests
+import httpx
 import json
 from app.routers import database
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
 import os
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 warnings.filterwarnings("ignore")
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
-lexora = LexoraAI()
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your_secret_key_here")
 ALGORITHM = "HS256"
@@ -43,6 +63,9 @@ class QueryRequest(BaseModel):
     temperature: float = 0.7
     n_chunks: int = 5
     doc_type: Optional[str] = None
+    rerank: Optional[bool] = None
+    backend: Optional[str] = None
+    priority: str = "interactive"
 
 class QueryResponse(BaseModel):
     answer: str
@@ -62,7 +85,7 @@ async def signup(data: SignUpRequest):
         
         # For now, create a simple user dict (you can add DB later)
         # Check if user exists (in production, check your database)
-        hashed = bcrypt.hashpw(data.password.encode(), bcrypt.gensalt()).decode()
+        hashed = await password_hasher.hash(data.password)
         
         # Generate token
         token = jwt.encode(
@@ -84,6 +107,8 @@ async def signup(data: SignUpRequest):
     
     except HTTPException:
         raise
+    except HashingBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -123,6 +148,8 @@ async def signin(data: SignInRequest):
 
 router.include_router(database.router, prefix="/db", tags=["database"])
 
+NON_LEGAL_ANSWER = "Hello, I'm LexoraAI, a legal document assistant. I answer questions related to legal documents and laws. Please upload a legal document and ask legal-related questions to get accurate answers."
+
 def is_legal_question(question):
     """Check if the question is related to legal matters"""
     legal_keywords = [
@@ -149,210 +176,374 @@ def is_legal_question(question):
     
     return True
 
-@router.post("/upload-pdf")
+@router.post("/upload-pdf", status_code=202)
 async def upload_pdf(file: UploadFile = File(...), doc_type: str = "general"):
-    """Upload and process PDF document with document type"""
+    """Save the PDF and queue it for background ingestion - returns a job id"""
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files allowed")
     
+    logger.debug("Upload %s doc_type=%s", file.filename, doc_type)
+    
+    filename = os.path.basename(file.filename)
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}_{filename}")
+    
     try:
-        print(f"UPLOAD DEBUG:")
-        print(f"   Received doc_type parameter: '{doc_type}'")
-        print(f"   File: {file.filename}")
-        
-        file_path = f"temp_{file.filename}"
-        
         with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        print(f"   Calling process_pdf_document with doc_type='{doc_type}'")
-        
-        chunks_count = lexora.process_pdf_document(
-            file_path,
-            doc_type=doc_type
-        )
-        
-        print(f"   Stored {chunks_count} chunks")
+            await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
         
+        job = ingestion_jobs.submit(file_path, filename, doc_type=doc_type)
+    except IngestionQueueFull as e:
         os.remove(file_path)
-        
-        response = {
-            "status": "success",
-            "filename": file.filename,
-            "doc_type": doc_type,
-            "chunks_stored": chunks_count
-        }
-        
-        print(f"   Response: {response}")
-        return response
-        
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("Upload of %s failed: %s", filename, e)
+        if os.path.exists(file_path):
+            os.remove(file_path)
         return {"status": "error", "message": str(e)}
+    
+    response = {
+        "status": "queued",
+        "job_id": job.id,
+        "filename": filename,
+        "doc_type": doc_type
+    }
+    
+    logger.info("Queued %s as job %s", filename, job.id)
+    return response
+
+@router.get("/jobs")
+async def list_jobs(limit: int = 50):
+    """List recent ingestion jobs, newest first"""
+    return {"jobs": ingestion_jobs.recent(limit)}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report status and per-stage progress of an ingestion job"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Re-queue a failed ingestion job"""
+    try:
+        job = ingestion_jobs.retry(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+def query_cache_scope(request):
+    """Answers are only reusable for the same retrieval settings"""
+    return ("query", request.n_chunks, request.rerank, request.backend or settings.LLM_BACKEND)
 
 @router.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
     """Query the model - searches ALL documents"""
+    start = time.perf_counter()
     try:
-        print(f"QUERY REQUEST:")
-        print(f"   Question: {request.question}")
-        print(f"   N Chunks: {request.n_chunks}")
+        logger.debug("Query n_chunks=%d: %s", request.n_chunks, request.question)
         
         if not is_legal_question(request.question):
-            print(f"   Not a legal question - returning friendly message")
             return {
-                "answer": "Hello, I'm LexoraAI, a legal document assistant. I answer questions related to legal documents and laws. Please upload a legal document and ask legal-related questions to get accurate answers.",
+                "answer": NON_LEGAL_ANSWER,
                 "using_documents": False,
                 "source_chunks": []
             }
         
-        response = lexora.query(
+        scope = query_cache_scope(request)
+        if settings.ANSWER_CACHE_ENABLED:
+            version = answer_cache.version
+            cached = await run_in_threadpool(answer_cache.get, request.question, scope)
+            if cached is not None:
+                log_query(request.question, cached, start, {}, cached=True)
+                return cached
+        
+        # Turn the request away before retrieval if generation can't take it
+        admit(request.backend, request.priority)
+        
+        response = await run_in_threadpool(
+            get_lexora().query,
             question=request.question,
             doc_type=None,
-            n_chunks=request.n_chunks
+            n_chunks=request.n_chunks,
+            rerank=request.rerank
         )
-        
-        print(f"   Documents found: {response.get('using_documents')}")
+        timings = response.pop("timings", {})
         
         if response.get('using_documents') and response.get('answer'):
-            print(f"   Calling Ollama to summarize...")
-            
-            summary_response = await summarize_text({
-                "text": response.get('answer', ''),
-                "question": request.question
-            })
+            summary, ok = await generate_summary(
+                request.question, response.get('answer', ''), timings,
+                backend=request.backend, priority=request.priority,
+                chunks=response.get('source_chunks')
+            )
+            response['answer'] = summary
             
-            response['answer'] = summary_response.get('summary', response.get('answer'))
-            print(f"   Answer summarized!")
+            if ok and settings.ANSWER_CACHE_ENABLED:
+                await run_in_threadpool(
+                    answer_cache.put, request.question, scope, response, version=version
+                )
         
+        log_query(request.question, response, start, timings)
         return response
+    except HTTPException:
+        raise
+    except GenerationRejected as e:
+        raise rejected(e)
     except Exception as e:
-        print(f"Query error: {e}")
+        logger.exception("Query error: %s", e)
         return {
             "answer": f"Error: {str(e)}",
             "using_documents": False,
             "source_chunks": []
         }
 
+def rejected(e):
+    """429/503 with Retry-After for a request the generation scheduler turned away"""
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def admit(backend, priority):
+    """Fail fast - 400 for a bad backend/priority, 429 when its queue is full"""
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITIES)}")
+    try:
+        scheduler_for(get_backend(backend)).check(priority)
+    except LLMBackendError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GenerationRejected as e:
+        raise rejected(e)
+
+def log_query(question, response, start, timings, cached=False):
+    """Hand the finished query to the write-behind log (no database work here)"""
+    timings = dict(timings, total=round((time.perf_counter() - start) * 1000, 2))
+    query_log_writer.record(
+        question,
+        response.get("answer", ""),
+        response.get("source_chunks", []),
+        timings=timings,
+        cached=cached
+    )
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/query/stream")
+async def query_stream(request: QueryRequest, http_request: Request):
+    """Stream the answer as SSE: 'sources' first, then 'token' events, then 'done'"""
+    
+    start = time.perf_counter()
+    admit(request.backend, request.priority)
+    
+    async def event_stream():
+        if not is_legal_question(request.question):
+            yield sse_event("sources", {"using_documents": False, "source_chunks": []})
+            yield sse_event("token", {"text": NON_LEGAL_ANSWER})
+            yield sse_event("done", {"answer": NON_LEGAL_ANSWER})
+            return
+        
+        scope = query_cache_scope(request)
+        if settings.ANSWER_CACHE_ENABLED:
+            version = answer_cache.version
+            cached = await run_in_threadpool(answer_cache.get, request.question, scope)
+            if cached is not None:
+                yield sse_event("sources", {
+                    "using_documents": cached["using_documents"],
+                    "source_chunks": cached["source_chunks"]
+                })
+                yield sse_event("token", {"text": cached["answer"]})
+                yield sse_event("done", {"answer": cached["answer"], "cached": True})
+                log_query(request.question, cached, start, {}, cached=True)
+                return
+        
+        response = await run_in_threadpool(
+            get_lexora().query,
+            question=request.question,
+            doc_type=None,
+            n_chunks=request.n_chunks,
+            rerank=request.rerank
+        )
+        timings = response.pop("timings", {})
+        
+        yield sse_event("sources", {
+            "using_documents": response.get("using_documents", False),
+            "source_chunks": response.get("source_chunks", [])
+        })
+        
+        raw_text = response.get("answer", "")
+        if not response.get("using_documents") or len(raw_text) < 50:
+            yield sse_event("done", {"answer": "Information not found in provided documents."})
+            return
+        
+        tokens = []
+        llm = get_backend(request.backend)
+        with stage_timer("prompt_build", timings):
+            prompt = await run_in_threadpool(
+                pack_prompt, llm, request.question, response.get("source_chunks") or [raw_text]
+            )
+        try:
+            async with scheduler_for(llm).slot(request.priority, timings=timings):
+                generate_start = time.perf_counter()
+                async for token in llm.stream(prompt, options=SUMMARY_OPTIONS):
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected - cancelling generation")
+                        return
+                    tokens.append(token)
+                    yield sse_event("token", {"text": token})
+        except GenerationRejected as e:
+            yield sse_event("error", {"message": str(e), "retry_after": e.retry_after})
+            return
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            STAGE_ERRORS.inc(stage="generate")
+            yield sse_event("error", {"message": "Request timed out. Please try again."})
+            return
+        except Exception as e:
+            STAGE_ERRORS.inc(stage="generate")
+            logger.warning("LLM stream error: %s", e)
+            yield sse_event("error", {"message": "Error processing request."})
+            return
+        generate_seconds = time.perf_counter() - generate_start
+        observe_stage("generate", generate_seconds)
+        timings["generate"] = round(generate_seconds * 1000, 2)
+        
+        answer = "".join(tokens).strip()
+        yield sse_event("done", {"answer": answer})
+        log_query(request.question, {
+            "answer": answer,
+            "source_chunks": response.get("source_chunks", [])
+        }, start, timings)
+        
+        if answer and settings.ANSWER_CACHE_ENABLED:
+            await run_in_threadpool(answer_cache.put, request.question, scope, {
+                "answer": answer,
+                "using_documents": True,
+                "source_chunks": response.get("source_chunks", [])
+            }, version=version)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/documents/count")
-async def get_document_count(doc_type: Optional[str] = None):
+async def get_document_count(doc_type: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     """Get count of stored document chunks"""
     try:
-        collection = chroma_db_manager.get_collection()
-        
-        if doc_type:
-            all_docs = collection.get(where={"doc_type": {"$eq": doc_type}})
-            count = len(all_docs['ids']) if all_docs['ids'] else 0
-        else:
-            count = collection.count()
-        
-        return {"total_chunks": count}
+        return {"total_chunks": await db.run_sync(chunk_catalog.count_chunks, doc_type)}
     except Exception as e:
         return {"total_chunks": 0, "error": str(e)}
 
+@router.get("/documents/stats")
+async def get_document_stats(source: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """Corpus counters: totals, per doc_type and optionally for one source"""
+    stats = {
+        "total": await db.run_sync(corpus_stats.get_totals),
+        "doc_types": await db.run_sync(corpus_stats.get_doc_types)
+    }
+    if source:
+        stats["source"] = {"name": source, "doc_types": await db.run_sync(corpus_stats.get_source, source)}
+    return stats
+
 @router.post("/documents/clear")
-async def clear_documents(doc_type: Optional[str] = None):
-    """Clear all stored documents, or only specific doc_type"""
+def clear_documents(doc_type: Optional[str] = None, source: Optional[str] = None):
+    """Clear all stored documents, or only one doc_type and/or source"""
     try:
-        collection = chroma_db_manager.get_collection()
-        
-        if doc_type:
-            all_docs = collection.get(where={"doc_type": {"$eq": doc_type}})
-            if all_docs['ids']:
-                collection.delete(ids=all_docs['ids'])
-            return {
-                "status": "success",
-                "message": f"All '{doc_type}' documents cleared"
-            }
+        if source:
+            removed = get_lexora().delete_source(source, doc_type=doc_type)
+            message = f"Document '{source}' cleared"
+        elif doc_type:
+            removed = get_lexora().clear_documents(doc_type=doc_type)
+            message = f"All '{doc_type}' documents cleared"
         else:
-            lexora.clear_documents()
-            return {"status": "success", "message": "All documents cleared"}
+            removed = get_lexora().clear_documents()
+            message = "All documents cleared"
+        return {"status": "success", "message": message, "chunks_removed": removed}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@router.delete("/documents")
+def delete_documents(source: str, doc_type: Optional[str] = None):
+    """Delete every chunk of one source document"""
+    removed = get_lexora().delete_source(source, doc_type=doc_type)
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"No chunks stored for '{source}'")
+    return {"status": "success", "source": source, "chunks_removed": removed}
+
+@router.post("/maintenance/compact")
+def compact_storage():
+    """Rebuild the collection and reclaim space left behind by deletes"""
+    try:
+        return {"status": "success", **maintenance.compact()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {e}")
+
 @router.get("/documents/list")
-async def list_documents(limit: int = 50, doc_type: Optional[str] = None):
-    """List all stored chunks"""
+async def list_documents(
+    limit: int = 50,
+    after: Optional[int] = None,
+    doc_type: Optional[str] = None,
+    source: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List stored chunks one page at a time; pass next_cursor back as 'after'"""
     try:
-        collection = chroma_db_manager.get_collection()
-        
-        if doc_type:
-            all_docs = collection.get(
-                where={"doc_type": {"$eq": doc_type}},
-                include=["documents", "metadatas"]
-            )
-        else:
-            all_docs = collection.get(include=["documents", "metadatas"])
-        
-        doc_count = len(all_docs['ids']) if all_docs['ids'] else 0
-        
-        if doc_count == 0:
-            return {"total_chunks": 0, "documents": []}
+        limit = max(1, min(limit, 500))
+        rows, next_cursor = await db.run_sync(
+            chunk_catalog.list_chunks, limit=limit, after=after, doc_type=doc_type, source=source
+        )
         
-        documents = []
-        for i, (doc_id, document, metadata) in enumerate(zip(
-            all_docs['ids'],
-            all_docs['documents'],
-            all_docs['metadatas']
-        )):
-            documents.append({
-                "chunk_id": doc_id,
-                "source": metadata.get("source", "unknown"),
-                "doc_type": metadata.get("doc_type", "general"),
-                "chunk_number": metadata.get("chunk", 0),
-                "text_preview": document[:200] + "..." if len(document) > 200 else document,
-                "full_text_length": len(document)
-            })
-            
-            if i >= limit - 1:
-                break
+        documents = [
+            {
+                "chunk_id": row.chunk_id,
+                "source": row.source,
+                "doc_type": row.doc_type,
+                "chunk_number": row.chunk_number,
+                "text_preview": row.text_preview,
+                "full_text_length": row.text_length
+            }
+            for row in rows
+        ]
         
         return {
-            "total_chunks": doc_count,
-            "showing": min(limit, len(documents)),
-            "documents": documents
+            "total_chunks": await db.run_sync(chunk_catalog.count_chunks, doc_type, source),
+            "showing": len(documents),
+            "documents": documents,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         return {"error": str(e)}
 
 @router.get("/documents/types")
-async def list_document_types():
+async def list_document_types(db: AsyncSession = Depends(get_async_db)):
     """List all unique document types in collection"""
     try:
-        collection = chroma_db_manager.get_collection()
-        
-        print(f"list_document_types called")
-        print(f"  Total docs in collection: {collection.count()}")
-        
-        all_docs = collection.get(include=["metadatas"])
-        
-        doc_types = set()
-        for idx, metadata in enumerate(all_docs['metadatas']):
-            doc_type = metadata.get("doc_type", "general")
-            doc_types.add(doc_type)
-        
-        print(f"  Final doc_types: {doc_types}")
-        
+        doc_types = await db.run_sync(chunk_catalog.list_doc_types)
         return {
-            "document_types": list(doc_types),
+            "document_types": doc_types,
             "count": len(doc_types)
         }
     except Exception as e:
-        print(f"ERROR in list_document_types: {e}")
+        logger.exception("list_document_types failed: %s", e)
         return {"error": str(e)}
 
-@router.post("/summarize")
-async def summarize_text(request: dict):
-    """Summarize using FREE local Ollama model (Mistral)"""
-    raw_text = request.get("text", "")
-    question = request.get("question", "")
-    
-    if not raw_text or len(raw_text) < 50:
-        return {"summary": "Information not found in provided documents."}
-    
-    raw_text = raw_text[:3000]
-    
-    prompt = f"""You are a legal document analyzer. Answer ONLY based on the legal text provided.
+SUMMARY_OPTIONS = {
+    'temperature': 0.2,
+    'top_k': 40,
+    'top_p': 0.9,
+    'num_ctx': settings.OLLAMA_NUM_CTX,
+    # The answer room pack_prompt reserves; bounded here so it cannot run into the context
+    'num_predict': settings.CONTEXT_ANSWER_TOKENS
+}
+
+def build_summary_prompt(question, raw_text):
+    """Build the grounded legal-answer prompt sent to Ollama"""
+    return f"""You are a legal document analyzer. Answer ONLY based on the legal text provided.
 
 User Question: "{question}"
 
@@ -373,43 +564,102 @@ CRITICAL RULES:
 
 Provide a clear, well-structured answer:"""
 
+def pack_prompt(llm, question, chunks, options=SUMMARY_OPTIONS):
+    """Grounded prompt holding as much ranked, de-overlapped context as the model's window allows.
+    
+    Room for the answer (num_predict, else CONTEXT_ANSWER_TOKENS) is reserved
+    first. Blocking: counting may load the model's tokenizer.
+    """
+    answer_tokens = options.get("num_predict") or settings.CONTEXT_ANSWER_TOKENS
+    budget = context_budget(
+        llm.max_prompt_tokens(answer_tokens),
+        llm.count_tokens(build_summary_prompt(question, ""))
+    )
+    packed = pack_context(chunks, budget, llm.count_tokens)
+    logger.debug(
+        "Packed %d chunks into %d/%d tokens (%d trimmed, %d dropped, %d overlap chars removed)",
+        packed["chunks"], packed["tokens"], budget, packed["trimmed"], packed["dropped"], packed["overlap_chars"]
+    )
+    return build_summary_prompt(question, packed["text"])
+
+async def generate_summary(question, raw_text, timings=None, backend=None, priority="interactive", chunks=None):
+    """Summarize retrieved text with an LLM backend (LLM_BACKEND by default); returns (summary, ok).
+    
+    The prompt is packed from `chunks` (retrieval results) when given, else
+    from `raw_text`. Generation waits for a slot from the backend's scheduler;
+    GenerationRejected propagates so routes can answer 429/503. Stage timings
+    (ms), including the queue wait, are added to `timings` if a dict is passed.
+    """
+    if not raw_text or len(raw_text) < 50:
+        return "Information not found in provided documents.", False
+    
     try:
-        print(f"SUMMARIZE DEBUG:")
-        print(f"   Question: {question}")
-        print(f"   Raw text length: {len(raw_text)}")
-        print(f"   Calling Ollama...")
+        llm = get_backend(backend)
+        with stage_timer("prompt_build", timings):
+            prompt = await run_in_threadpool(pack_prompt, llm, question, chunks or [raw_text])
         
-        response = requests.post(
-            'http://localhost:11434/api/generate',
-            json={
-                'model': 'mistral',
-                'prompt': prompt,
-                'stream': False,
-                'temperature': 0.2,
-                'top_k': 40,
-                'top_p': 0.9
-            },
-            timeout=60
-        )
+        logger.debug("Summarizing %d chars for: %s", len(prompt), question)
         
-        if response.status_code == 200:
-            result = response.json()
-            summary = result.get('response', '').strip()
-            
-            print(f"   Ollama returned {len(summary)} chars")
-            
-            if not summary or "Error" in summary:
-                print(f"   Ollama returned empty/error")
-                return {"summary": "Unable to process your question."}
-            
-            return {"summary": summary}
-        else:
-            print(f"   Ollama HTTP Error: {response.status_code}")
-            return {"summary": "Error processing request."}
+        async with scheduler_for(llm).slot(priority, timings=timings):
+            with stage_timer("generate", timings):
+                summary = await llm.generate(prompt, options=SUMMARY_OPTIONS)
+        summary = summary.strip()
+        
+        if not summary or "Error" in summary:
+            logger.warning("LLM returned an empty or error answer")
+            return "Unable to process your question.", False
+        
+        return summary, True
             
-    except requests.exceptions.Timeout:
-        print(f"   Ollama TIMEOUT")
-        return {"summary": "Request timed out. Please try again."}
+    except GenerationRejected:
+        raise
+    except (httpx.TimeoutException, asyncio.TimeoutError):
+        logger.warning("LLM generation timed out")
+        return "Request timed out. Please try again.", False
+    except OllamaError as e:
+        logger.warning("Ollama HTTP error: %s", e.status_code)
+        return "Error processing request.", False
+    except LLMBackendError as e:
+        logger.warning("LLM backend error: %s", e)
+        return "Error processing request.", False
     except Exception as e:
-        print(f"   Ollama error: {e}")
-        return {"summary": "Error processing request."}
+        logger.exception("LLM error: %s", e)
+        return "Error processing request.", False
+
+@router.post("/summarize")
+async def summarize_text(request: dict):
+    """Summarize with the configured LLM backend (local Ollama by default); pass "backend" to pick another"""
+    raw_text = request.get("text", "")
+    question = request.get("question", "")
+    backend = request.get("backend")
+    # Bulk summarization queues behind interactive queries unless told otherwise
+    priority = request.get("priority", "batch")
+    
+    # Summaries depend on the exact input text, so only exact matches are reused
+    scope = ("summarize", text_hash(raw_text), backend or settings.LLM_BACKEND)
+    if settings.ANSWER_CACHE_ENABLED:
+        version = answer_cache.version
+        cached = answer_cache.get(question, scope, semantic=False)
+        if cached is not None:
+            return cached
+    
+    admit(backend, priority)
+    try:
+        summary, ok = await generate_summary(question, raw_text, backend=backend, priority=priority)
+    except GenerationRejected as e:
+        raise rejected(e)
+    response = {"summary": summary}
+    
+    if ok and settings.ANSWER_CACHE_ENABLED:
+        answer_cache.put(question, scope, response, semantic=False, version=version)
+    return response
+
+@router.get("/llm/backends")
+async def llm_backends():
+    """Configured default backend, and each backend's availability and load"""
+    return await run_in_threadpool(backends_info)
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Answer cache hit/miss metrics"""
+    return answer_cache.stats()
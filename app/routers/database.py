@@ -1,31 +1,122 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from app.core.database import get_async_db
 from app.models.db_models import Document, QueryLog
 from app.models.schemas import DocumentCreate, QueryLogCreate
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 200
+
+# Listing columns only - content, chunk_hashes, answer and sources stay
+# unloaded until a detail endpoint asks for one row
+DOCUMENT_LIST_COLUMNS = (
+    Document.id, Document.filename, Document.doc_type, Document.indexed,
+    Document.chunk_count, Document.uploaded_at, Document.updated_at
+)
+QUERY_LOG_LIST_COLUMNS = (QueryLog.id, QueryLog.question, QueryLog.cached, QueryLog.created_at)
+
+
+async def keyset_page(db, stmt, model, date_column, limit, cursor, since, until):
+    """Newest first by id; returns (rows, next_cursor)"""
+    if cursor is not None:
+        stmt = stmt.where(model.id < cursor)
+    if since is not None:
+        stmt = stmt.where(date_column >= since)
+    if until is not None:
+        stmt = stmt.where(date_column < until)
+    rows = (await db.scalars(stmt.order_by(model.id.desc()).limit(limit + 1))).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
 @router.post("/documents")
-def create_document(doc: DocumentCreate, db: Session = Depends(get_db)):
+async def create_document(doc: DocumentCreate, db: AsyncSession = Depends(get_async_db)):
     db_doc = Document(**doc.dict())
     db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
+    await db.commit()
+    await db.refresh(db_doc)
     return db_doc
 
 @router.get("/documents")
-def get_documents(db: Session = Depends(get_db)):
-    return db.query(Document).all()
+async def get_documents(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    doc_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of documents without their content; pass next_cursor back as 'cursor'"""
+    stmt = select(Document).options(load_only(*DOCUMENT_LIST_COLUMNS))
+    if doc_type:
+        stmt = stmt.where(Document.doc_type == doc_type)
+    rows, next_cursor = await keyset_page(db, stmt, Document, Document.uploaded_at, limit, cursor, since, until)
+    return {
+        "documents": [
+            {
+                "id": doc.id,
+                "filename": doc.filename,
+                "doc_type": doc.doc_type,
+                "indexed": doc.indexed,
+                "chunk_count": doc.chunk_count,
+                "uploaded_at": doc.uploaded_at,
+                "updated_at": doc.updated_at
+            }
+            for doc in rows
+        ],
+        "next_cursor": next_cursor
+    }
+
+@router.get("/documents/{document_id}")
+async def get_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    doc = await db.get(Document, document_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
 
 @router.post("/query-logs")
-def log_query(query: QueryLogCreate, db: Session = Depends(get_db)):
+async def log_query(query: QueryLogCreate, db: AsyncSession = Depends(get_async_db)):
     db_query = QueryLog(**query.dict())
     db.add(db_query)
-    db.commit()
-    db.refresh(db_query)
+    await db.commit()
+    await db.refresh(db_query)
     return db_query
 
 @router.get("/query-logs")
-def get_query_logs(db: Session = Depends(get_db)):
-    return db.query(QueryLog).all()
+async def get_query_logs(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cached: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of query logs without answers or sources; pass next_cursor back as 'cursor'"""
+    stmt = select(QueryLog).options(load_only(*QUERY_LOG_LIST_COLUMNS))
+    if cached is not None:
+        stmt = stmt.where(QueryLog.cached == cached)
+    rows, next_cursor = await keyset_page(db, stmt, QueryLog, QueryLog.created_at, limit, cursor, since, until)
+    return {
+        "query_logs": [
+            {
+                "id": log.id,
+                "question": log.question,
+                "cached": log.cached,
+                "created_at": log.created_at
+            }
+            for log in rows
+        ],
+        "next_cursor": next_cursor
+    }
+
+@router.get("/query-logs/{log_id}")
+async def get_query_log(log_id: int, db: AsyncSession = Depends(get_async_db)):
+    log = await db.get(QueryLog, log_id)
+    if log is None:
+        raise HTTPException(status_code=404, detail="Query log not found")
+    return log
@@ -0,0 +1,179 @@
+"""
+Relational catalog of stored chunks.
+
+Mirrors the id, source, doc_type, position and a short preview of every
+chunk in ChromaDB so listing and filtering never has to load vectors or full
+chunk text. Kept in sync by LexoraAI at ingest and delete time; every change is also
+applied to the corpus counters (app/services/corpus_stats.py) in the same
+transaction. LexoraAI backfills it on startup when it is empty but the
+collection is not; --backfill forces a rebuild.
+
+    python -m app.services.chunk_catalog --backfill
+"""
+import argparse
+
+from sqlalchemy import bindparam, func
+
+from app.models.db_models import Chunk
+from app.services import corpus_stats
+
+PREVIEW_LENGTH = 200
+
+
+def preview(text):
+    return text[:PREVIEW_LENGTH] + "..." if len(text) > PREVIEW_LENGTH else text
+
+def add_chunks(db, source, doc_type, rows):
+    """Insert catalog rows; rows are (chunk_id, chunk_number, text) tuples"""
+    if not rows:
+        return
+    db.bulk_insert_mappings(Chunk, [
+        {
+            "chunk_id": chunk_id,
+            "source": source,
+            "doc_type": doc_type,
+            "chunk_number": chunk_number,
+            "text_preview": preview(text),
+            "text_length": len(text)
+        }
+        for chunk_id, chunk_number, text in rows
+    ])
+    corpus_stats.apply_deltas(db, {
+        (doc_type or "general", source): [len(rows), sum(len(text) for _, _, text in rows)]
+    })
+
+def _existing(db, chunk_ids, batch_size=500):
+    """(source, doc_type, text_length) of catalogued chunks, in batches of ids"""
+    for i in range(0, len(chunk_ids), batch_size):
+        yield from db.query(Chunk.source, Chunk.doc_type, Chunk.text_length).filter(
+            Chunk.chunk_id.in_(chunk_ids[i:i + batch_size])
+        )
+
+def move_chunks(db, doc_type, rows):
+    """Update position/doc_type of kept chunks; rows are (chunk_id, chunk_number) tuples"""
+    if not rows:
+        return
+    deltas = {}
+    for source, old_doc_type, length in _existing(db, [chunk_id for chunk_id, _ in rows]):
+        if old_doc_type != doc_type:
+            corpus_stats.add_delta(deltas, old_doc_type, source, -1, -length)
+            corpus_stats.add_delta(deltas, doc_type, source, 1, length)
+    table = Chunk.__table__
+    db.execute(
+        table.update()
+        .where(table.c.chunk_id == bindparam("b_chunk_id"))
+        .values(chunk_number=bindparam("b_chunk_number"), doc_type=bindparam("b_doc_type")),
+        [
+            {"b_chunk_id": chunk_id, "b_chunk_number": chunk_number, "b_doc_type": doc_type}
+            for chunk_id, chunk_number in rows
+        ]
+    )
+    corpus_stats.apply_deltas(db, deltas)
+
+def remove_chunks(db, chunk_ids, batch_size=500):
+    deltas = {}
+    for source, doc_type, length in _existing(db, chunk_ids, batch_size):
+        corpus_stats.add_delta(deltas, doc_type, source, -1, -length)
+    for i in range(0, len(chunk_ids), batch_size):
+        db.query(Chunk).filter(Chunk.chunk_id.in_(chunk_ids[i:i + batch_size])).delete(
+            synchronize_session=False
+        )
+    corpus_stats.apply_deltas(db, deltas)
+
+def clear_chunks(db, doc_type=None):
+    query = db.query(Chunk)
+    if doc_type:
+        query = query.filter(Chunk.doc_type == doc_type)
+    query.delete(synchronize_session=False)
+    corpus_stats.reset(db, doc_type)
+
+def list_chunks(db, limit=50, after=None, doc_type=None, source=None):
+    """One keyset page ordered by catalog id; returns (rows, next_cursor)"""
+    query = db.query(Chunk)
+    if doc_type:
+        query = query.filter(Chunk.doc_type == doc_type)
+    if source:
+        query = query.filter(Chunk.source == source)
+    if after is not None:
+        query = query.filter(Chunk.id > after)
+    rows = query.order_by(Chunk.id).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def iter_chunk_ids(db, doc_type=None, source=None, batch_size=500):
+    """Yield lists of chunk ids in catalog order; safe to delete each batch as it is yielded"""
+    after = None
+    while True:
+        query = db.query(Chunk.id, Chunk.chunk_id)
+        if doc_type:
+            query = query.filter(Chunk.doc_type == doc_type)
+        if source:
+            query = query.filter(Chunk.source == source)
+        if after is not None:
+            query = query.filter(Chunk.id > after)
+        rows = query.order_by(Chunk.id).limit(batch_size).all()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield [chunk_id for _, chunk_id in rows]
+
+def count_chunks(db, doc_type=None, source=None):
+    if source:
+        counters = corpus_stats.get_source(db, source)
+        return sum(row["chunks"] for kind, row in counters.items() if not doc_type or kind == doc_type)
+    return corpus_stats.get_totals(db, doc_type)["chunks"]
+
+def is_empty(db):
+    return db.query(Chunk.id).first() is None
+
+def catalog_size(db):
+    """Rows in the catalog, counted directly (not from the corpus counters)"""
+    return db.query(func.count(Chunk.id)).scalar()
+
+def list_doc_types(db):
+    return list(corpus_stats.get_doc_types(db))
+
+def backfill_from_collection(db, collection, batch_size=1000):
+    """Rebuild the catalog from what is stored in a Chroma collection"""
+    clear_chunks(db)
+    offset = 0
+    total = 0
+    while True:
+        batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        db.bulk_insert_mappings(Chunk, [
+            {
+                "chunk_id": chunk_id,
+                "source": (metadata or {}).get("source", "unknown"),
+                "doc_type": (metadata or {}).get("doc_type", "general"),
+                "chunk_number": (metadata or {}).get("chunk", (metadata or {}).get("chunk_id", 0)),
+                "text_preview": preview(text or ""),
+                "text_length": len(text or "")
+            }
+            for chunk_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"])
+        ])
+        offset += len(batch["ids"])
+        total += len(batch["ids"])
+    corpus_stats.rebuild(db)
+    db.commit()
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backfill", action="store_true", help="rebuild the catalog from ChromaDB")
+    args = parser.parse_args()
+
+    if args.backfill:
+        from app.core.chromadb_manager import chroma_db_manager
+        from app.core.config import settings
+        from app.core.database import SessionLocal, init_db
+
+        init_db()
+        _, collection = chroma_db_manager.initialize(db_path=settings.CHROMA_PATH)
+        db = SessionLocal()
+        try:
+            print(f"Catalogued {backfill_from_collection(db, collection)} chunks")
+        finally:
+            db.close()
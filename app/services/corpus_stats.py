@@ -0,0 +1,107 @@
+"""
+Incrementally maintained corpus counters.
+
+The chunk catalog reports every change as (doc_type, source) deltas, which
+are applied to the corpus_stats rows in the caller's transaction. Reads are
+single-row lookups, so count endpoints and health checks never scan the
+catalog or ChromaDB.
+"""
+from sqlalchemy import func
+
+from app.models.db_models import Chunk, CorpusStat
+
+TOTAL = ""
+
+
+def _row(db, doc_type, source):
+    row = (
+        db.query(CorpusStat)
+        .filter(CorpusStat.doc_type == doc_type, CorpusStat.source == source)
+        .with_for_update()
+        .first()
+    )
+    if row is None:
+        row = CorpusStat(doc_type=doc_type, source=source, chunks=0, documents=0, bytes=0)
+        db.add(row)
+        db.flush()
+    return row
+
+def apply_deltas(db, deltas):
+    """Apply {(doc_type, source): [chunks, bytes]} changes; does not commit"""
+    for (doc_type, source), (chunks, size) in deltas.items():
+        if not chunks and not size:
+            continue
+        doc_type = doc_type or "general"
+        pair = _row(db, doc_type, source)
+        had_chunks = pair.chunks > 0
+        pair.chunks += chunks
+        pair.bytes += size
+        documents = int(pair.chunks > 0) - int(had_chunks)
+        pair.documents = int(pair.chunks > 0)
+
+        for row in (_row(db, doc_type, TOTAL), _row(db, TOTAL, TOTAL)):
+            row.chunks += chunks
+            row.bytes += size
+            row.documents += documents
+
+    # Drop rows that no longer describe anything (keeps the type list exact)
+    db.flush()
+    db.query(CorpusStat).filter(
+        CorpusStat.doc_type != TOTAL, CorpusStat.chunks <= 0
+    ).delete(synchronize_session=False)
+
+def add_delta(deltas, doc_type, source, chunks, size):
+    entry = deltas.setdefault((doc_type or "general", source), [0, 0])
+    entry[0] += chunks
+    entry[1] += size
+
+def reset(db, doc_type=None):
+    """Drop counters for one doc_type (adjusting the total) or for everything"""
+    if not doc_type:
+        db.query(CorpusStat).delete(synchronize_session=False)
+        return
+    row = db.query(CorpusStat).filter(
+        CorpusStat.doc_type == doc_type, CorpusStat.source == TOTAL
+    ).first()
+    if row is not None:
+        total = _row(db, TOTAL, TOTAL)
+        total.chunks -= row.chunks
+        total.bytes -= row.bytes
+        total.documents -= row.documents
+    db.query(CorpusStat).filter(CorpusStat.doc_type == doc_type).delete(synchronize_session=False)
+
+def rebuild(db):
+    """Recompute every counter from the chunk catalog; does not commit"""
+    reset(db)
+    deltas = {}
+    grouped = db.query(
+        Chunk.doc_type, Chunk.source, func.count(Chunk.id), func.coalesce(func.sum(Chunk.text_length), 0)
+    ).group_by(Chunk.doc_type, Chunk.source)
+    for doc_type, source, chunks, size in grouped:
+        add_delta(deltas, doc_type, source, chunks, int(size))
+    apply_deltas(db, deltas)
+
+# ============= READS =============
+
+def _as_dict(row):
+    if row is None:
+        return {"chunks": 0, "documents": 0, "bytes": 0}
+    return {"chunks": row.chunks, "documents": row.documents, "bytes": row.bytes}
+
+def get_totals(db, doc_type=None):
+    row = db.query(CorpusStat).filter(
+        CorpusStat.doc_type == (doc_type or TOTAL), CorpusStat.source == TOTAL
+    ).first()
+    return _as_dict(row)
+
+def get_doc_types(db):
+    """{doc_type: counters} for every doc_type with stored chunks"""
+    rows = db.query(CorpusStat).filter(
+        CorpusStat.doc_type != TOTAL, CorpusStat.source == TOTAL
+    ).order_by(CorpusStat.doc_type)
+    return {row.doc_type: _as_dict(row) for row in rows}
+
+def get_source(db, source):
+    """{doc_type: counters} for one source"""
+    rows = db.query(CorpusStat).filter(CorpusStat.source == source)
+    return {row.doc_type: _as_dict(row) for row in rows}
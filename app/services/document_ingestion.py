@@ -1,9 +1,9 @@
 import os
-import fitz  # PyMuPDF
 from PIL import Image
 import pytesseract
 import re
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.services.pdf_extraction import extract_pdf_text
 
 # Tesseract path config (adjust if needed)
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -16,12 +16,7 @@ LEGAL_HEADING_PATTERNS = [
 ]
 
 def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text("text")
-    doc.close()
-    return text
+    return extract_pdf_text(pdf_path, separator="")
 
 def extract_text_from_image(image_path):
     image = Image.open(image_path)
@@ -0,0 +1,277 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.lexora import get_lexora, split_text, embed_chunks, file_sha256
+from app.core.metrics import STAGE_ERRORS, observe_stage
+from app.services.pdf_extraction import extract_pdf_text, shutdown_extraction_pool
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["hash", "extract", "split", "embed", "store"]
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue is at capacity"""
+
+
+class IngestionJob:
+    """State of one uploaded PDF moving through the ingestion stages"""
+
+    def __init__(self, file_path, filename, doc_type="general"):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.filename = filename
+        self.doc_type = doc_type
+        self.status = "queued"
+        self.stages = {stage: "pending" for stage in STAGES}
+        self.stage_seconds = {}
+        self.attempts = 0
+        self.error = None
+        self.chunks_stored = None
+        self.result = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "failed")
+
+    def to_dict(self):
+        done = sum(1 for state in self.stages.values() if state in ("done", "skipped"))
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "doc_type": self.doc_type,
+            "status": self.status,
+            "stages": dict(self.stages),
+            "stage_seconds": dict(self.stage_seconds),
+            "progress": round(done / len(STAGES), 2),
+            "attempts": self.attempts,
+            "error": self.error,
+            "chunks_stored": self.chunks_stored,
+            "result": self.result,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class IngestionJobManager:
+    """Bounded background queue that runs PDF ingestion off the request path.
+
+    Splitting and embedding run in a process pool, extraction fans pages out
+    over the shared extraction pool, and the ChromaDB write runs in a thread
+    because the persistent client lives in this process.
+    """
+
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self.queue = None
+        self.pool = None
+        self.workers = []
+
+    @property
+    def lexora(self):
+        # Resolved on use so starting the workers does not open Chroma
+        return get_lexora()
+
+    async def start(self):
+        """Start the worker tasks and process pool - call on app startup"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        self.pool = self._new_pool()
+        self.workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(settings.INGEST_WORKERS)
+        ]
+
+    async def stop(self):
+        """Cancel the workers and shut the process pool down"""
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        shutdown_extraction_pool()
+
+    def submit(self, file_path, filename, doc_type="general"):
+        """Queue a saved PDF for ingestion; raises IngestionQueueFull when at capacity"""
+        job = IngestionJob(file_path, filename, doc_type)
+        self._enqueue(job)
+        self._remember(job)
+        return job
+
+    def retry(self, job_id):
+        """Re-queue a failed job; returns None if unknown, raises ValueError if not failed"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status != "failed":
+            raise ValueError(f"Job {job_id} is '{job.status}', only failed jobs can be retried")
+        if not os.path.exists(job.file_path):
+            raise ValueError(f"Upload for job {job_id} is no longer available")
+
+        job.status = "queued"
+        job.error = None
+        job.attempts = 0
+        job.finished_at = None
+        job.stages = {stage: "pending" for stage in STAGES}
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def recent(self, limit=50):
+        return [job.to_dict() for job in reversed(list(self.jobs.values()))][:limit]
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=settings.INGEST_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _enqueue(self, job):
+        if self.queue is None:
+            raise RuntimeError("Ingestion workers are not running")
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise IngestionQueueFull(
+                f"Ingestion queue is full ({settings.INGEST_QUEUE_SIZE} jobs waiting)"
+            )
+
+    def _remember(self, job):
+        """Keep a bounded history; forget the oldest finished jobs first"""
+        self.jobs[job.id] = job
+        while len(self.jobs) > settings.INGEST_JOB_HISTORY:
+            oldest = next((j for j in self.jobs.values() if j.finished), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest.id]
+            self._remove_upload(oldest)
+
+    def _remove_upload(self, job):
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job):
+        job.started_at = datetime.utcnow()
+        while True:
+            job.attempts += 1
+            job.status = "running"
+            job.stages = {stage: "pending" for stage in STAGES}
+            try:
+                job.result = await self._run_stages(job)
+                job.chunks_stored = job.result["chunks"]
+                job.status = "completed"
+                job.finished_at = datetime.utcnow()
+                self._remove_upload(job)
+                logger.info("Ingestion job %s (%s): %s", job.id, job.filename, job.result)
+                return
+            except Exception as e:
+                job.error = str(e)
+                for stage, state in job.stages.items():
+                    if state == "running":
+                        job.stages[stage] = "failed"
+                logger.warning("Ingestion job %s attempt %d failed: %s", job.id, job.attempts, e)
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died (e.g. OOM on a huge PDF); replace the pool
+                    self.pool = self._new_pool()
+
+                if job.attempts > settings.INGEST_MAX_RETRIES:
+                    # Keep the upload on disk so the job can be retried manually
+                    job.status = "failed"
+                    job.finished_at = datetime.utcnow()
+                    return
+
+                job.status = "retrying"
+                await asyncio.sleep(settings.INGEST_RETRY_BACKOFF * job.attempts)
+
+    async def _run_stages(self, job):
+        loop = asyncio.get_running_loop()
+
+        file_hash = await self._stage(job, "hash", loop.run_in_executor(
+            None, file_sha256, job.file_path
+        ))
+        unchanged = await loop.run_in_executor(
+            None, self.lexora.is_unchanged, job.filename, file_hash, job.doc_type
+        )
+        if unchanged:
+            for stage in STAGES:
+                job.stages[stage] = "skipped"
+            return await loop.run_in_executor(None, self.lexora.skipped_result, job.filename)
+
+        text = await self._stage(job, "extract", loop.run_in_executor(
+            None, extract_pdf_text, job.file_path
+        ))
+        chunks = await self._stage(job, "split", loop.run_in_executor(
+            self.pool, split_text, text
+        ))
+
+        # Only chunks whose content hash is not indexed yet get embedded
+        plan = await loop.run_in_executor(
+            None, self.lexora.plan_chunks, job.filename, chunks, job.doc_type
+        )
+        embeddings = None
+        if plan["new"]:
+            new_chunks = [chunks[idx] for idx in plan["new"]]
+            embeddings = await self._stage(job, "embed", loop.run_in_executor(
+                self.pool, embed_chunks, new_chunks
+            ))
+        else:
+            job.stages["embed"] = "skipped"
+
+        # store_chunks records its own "store" timing (and "embed" if it re-embeds)
+        return await self._stage(job, "store", record=False, future=loop.run_in_executor(
+            None, functools.partial(
+                self.lexora.store_chunks,
+                job.filename,
+                chunks,
+                doc_type=job.doc_type,
+                embeddings=embeddings,
+                file_hash=file_hash,
+                plan=plan
+            )
+        ))
+
+    async def _stage(self, job, stage, future, record=True):
+        job.stages[stage] = "running"
+        start = time.perf_counter()
+        try:
+            result = await future
+        except Exception:
+            STAGE_ERRORS.inc(stage=stage)
+            raise
+        elapsed = time.perf_counter() - start
+        job.stage_seconds[stage] = round(elapsed, 4)
+        if record:
+            observe_stage(stage, elapsed)
+        job.stages[stage] = "done"
+        return result
+
+
+# Global instance
+ingestion_jobs = IngestionJobManager()
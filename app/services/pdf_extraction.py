@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+from bisect import bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+
+PageText = namedtuple("PageText", ["page_number", "text"])
+
+_pool = None
+
+
+def get_extraction_pool():
+    """Shared process pool for page extraction (created on first use)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_EXTRACT_WORKERS or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+def _extract_range(pdf_path, start, end):
+    """Extract pages [start, end) - runs inside a worker process"""
+    with fitz.open(pdf_path) as doc:
+        return [doc.load_page(i).get_text("text") for i in range(start, end)]
+
+def iter_pdf_pages(pdf_path, parallel=True, pages_per_task=None):
+    """Yield PageText(page_number, text) in page order (page numbers start at 1).
+
+    Large PDFs are split into page ranges extracted across the shared process
+    pool. Only a small window of ranges is in flight at once, so memory stays
+    bounded no matter how many pages the document has.
+    """
+    pdf_path = str(pdf_path)
+    pages_per_task = pages_per_task or settings.PDF_PAGES_PER_TASK
+    total = page_count(pdf_path)
+
+    if not parallel or total < settings.PDF_PARALLEL_MIN_PAGES:
+        with fitz.open(pdf_path) as doc:
+            for i in range(total):
+                yield PageText(i + 1, doc.load_page(i).get_text("text"))
+        return
+
+    pool = get_extraction_pool()
+    window = 2 * (settings.PDF_EXTRACT_WORKERS or os.cpu_count())
+    ranges = iter(range(0, total, pages_per_task))
+    in_flight = deque()
+
+    def submit_next():
+        start = next(ranges, None)
+        if start is None:
+            return False
+        end = min(start + pages_per_task, total)
+        in_flight.append((start, pool.submit(_extract_range, pdf_path, start, end)))
+        return True
+
+    while len(in_flight) < window and submit_next():
+        pass
+
+    try:
+        while in_flight:
+            start, future = in_flight.popleft()
+            texts = future.result()
+            submit_next()
+            for offset, text in enumerate(texts):
+                yield PageText(start + offset + 1, text)
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+def extract_pdf_text(pdf_path, separator="\n", parallel=True):
+    """Extract the full text of a PDF"""
+    return separator.join(page.text for page in iter_pdf_pages(pdf_path, parallel=parallel))
+
+def extract_pdf_text_with_offsets(pdf_path, separator="\n", parallel=True):
+    """Extract the full text plus the character offset where each page starts"""
+    parts = []
+    offsets = []
+    position = 0
+    for page in iter_pdf_pages(pdf_path, parallel=parallel):
+        if parts:
+            position += len(separator)
+        offsets.append(position)
+        parts.append(page.text)
+        position += len(page.text)
+    return separator.join(parts), offsets
+
+def page_for_offset(offsets, position):
+    """Map a character offset in the joined text back to its 1-based page number"""
+    return max(bisect_right(offsets, position), 1)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import registry
+from app.models.db_models import QueryLog
+
+logger = logging.getLogger(__name__)
+
+SOURCE_FIELDS = ("metadata", "distance", "score", "rerank_score", "match")
+
+QUERY_LOG_ROWS = registry.counter("lexora_query_log_rows_total", "Query log rows by outcome")
+
+
+class QueryLogWriter:
+    """Write-behind buffer for QueryLog rows.
+
+    `record` only appends to an in-memory buffer. A background task flushes
+    the buffer with one bulk insert when it reaches QUERY_LOG_BATCH_SIZE rows
+    or every QUERY_LOG_FLUSH_INTERVAL seconds, in a worker thread. The buffer
+    is capped at QUERY_LOG_BUFFER_MAX rows (oldest dropped first) and is
+    drained on shutdown.
+    """
+
+    def __init__(self):
+        self.buffer = deque()
+        self.lock = threading.Lock()
+        self.wakeup = None
+        self.task = None
+        self.dropped = 0
+
+    async def start(self):
+        """Start the flush task - call on app startup"""
+        if self.task is not None or not settings.QUERY_LOG_ENABLED:
+            return
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        """Stop the flush task and write whatever is still buffered"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        while self.buffer:
+            await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def record(self, question, answer, sources=None, timings=None, cached=False):
+        """Buffer one row; never touches the database"""
+        if not settings.QUERY_LOG_ENABLED:
+            return
+        row = {
+            "question": question,
+            "answer": answer,
+            # Chunk text is left out; metadata identifies the chunk
+            "sources": [
+                {key: chunk[key] for key in SOURCE_FIELDS if key in chunk}
+                for chunk in (sources or [])
+            ],
+            "timings": timings or {},
+            "cached": cached,
+            "created_at": datetime.utcnow()
+        }
+        with self.lock:
+            if len(self.buffer) >= settings.QUERY_LOG_BUFFER_MAX:
+                self.buffer.popleft()
+                self.dropped += 1
+                QUERY_LOG_ROWS.inc(result="dropped")
+            self.buffer.append(row)
+            full = len(self.buffer) >= settings.QUERY_LOG_BATCH_SIZE
+        if full and self.wakeup is not None:
+            self.wakeup.set()
+
+    def flush(self):
+        """Write up to one batch with a single bulk insert; returns rows written"""
+        with self.lock:
+            batch = [self.buffer.popleft() for _ in range(min(len(self.buffer), settings.QUERY_LOG_BATCH_SIZE))]
+        if not batch:
+            return 0
+
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(QueryLog, batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            QUERY_LOG_ROWS.inc(len(batch), result="failed")
+            logger.warning("Dropping %d query log rows: %s", len(batch), e)
+            return 0
+        finally:
+            db.close()
+        QUERY_LOG_ROWS.inc(len(batch), result="written")
+        return len(batch)
+
+    async def _flusher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=settings.QUERY_LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            while self.buffer:
+                start = time.perf_counter()
+                written = await loop.run_in_executor(None, self.flush)
+                if not written:
+                    break
+                logger.debug("Flushed %d query log rows in %.1f ms", written, (time.perf_counter() - start) * 1000)
+
+
+# Global instance
+query_log_writer = QueryLogWriter()
@@ -0,0 +1,124 @@
+"""
+Local stand-in for the Ollama HTTP API.
+
+Answers /api/generate (streaming NDJSON or a single JSON body) with
+deterministic filler text, after a configurable first-token latency and at
+a configurable token rate, so load tests measure LexoraAI rather than the
+model.
+
+    python -m benchmarks.fake_ollama --port 11435 --tokens-per-sec 40 --first-token-ms 300
+    OLLAMA_URL=http://localhost:11435 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "The Court may direct that in the event of arrest the person shall be "
+    "released on bail subject to the conditions specified under this section"
+).split()
+
+
+def create_app(tokens_per_sec=40.0, first_token_ms=300.0, answer_tokens=120, error_rate=0.0):
+    app = FastAPI(title="fake-ollama")
+    state = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def tokens():
+        return [WORDS[i % len(WORDS)] + " " for i in range(answer_tokens)]
+
+    def should_fail():
+        # Deterministic: every Nth request fails
+        return error_rate > 0 and state["requests"] % max(1, round(1 / error_rate)) == 0
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        state["requests"] += 1
+        if should_fail():
+            return JSONResponse({"error": "fake failure"}, status_code=500)
+
+        model = body.get("model", "fake")
+        delay = 1.0 / tokens_per_sec if tokens_per_sec else 0.0
+
+        async def stream():
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            try:
+                await asyncio.sleep(first_token_ms / 1000)
+                for token in tokens():
+                    yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+                    await asyncio.sleep(delay)
+                yield json.dumps({"model": model, "response": "", "done": True}) + "\n"
+            finally:
+                state["in_flight"] -= 1
+
+        if body.get("stream", True):
+            return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+        text = []
+        async for line in stream():
+            text.append(json.loads(line)["response"])
+        return {"model": model, "response": "".join(text), "done": True}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "fake"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return dict(state)
+
+    return app
+
+
+class FakeOllamaServer:
+    """Runs the fake server on a background thread (for in-process benchmarks)"""
+
+    def __init__(self, host="127.0.0.1", port=11435, **options):
+        self.url = f"http://{host}:{port}"
+        config = uvicorn.Config(create_app(**options), host=host, port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self, timeout=10):
+        self.thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("fake Ollama did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.tokens_per_sec, args.first_token_ms, args.answer_tokens, args.error_rate),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
@@ -0,0 +1,110 @@
+"""
+Benchmark the LLM backends against each other on this machine.
+
+Runs the same prompts through each backend (in-process, no HTTP server) and
+reports load time, time to first token, tokens/sec and end-to-end latency.
+Backends whose dependencies or model files are missing are reported as
+skipped.
+
+    python -m benchmarks.llm_backends --backends ollama llamacpp hf \\
+        --requests 8 --concurrency 2 --max-tokens 128 --threads 8
+
+Micro-batching of the hf backend: compare --hf-batch-size 1 with 4 or 8 at
+--concurrency 8 (total_tokens_per_sec vs latency_ms).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.core.config import settings
+from app.core.llm_backends import BACKENDS, get_backend
+from app.core.llm_client import ollama_client
+from benchmarks.load_test import distribution, run_pool
+
+PROMPT = """You are a legal document analyzer. Answer ONLY based on the legal text provided.
+
+User Question: "What is the punishment for theft?"
+
+Legal Text:
+Whoever commits theft shall be punished with imprisonment of either description for a term
+which may extend to three years, or with fine, or with both.
+
+Provide a clear, well-structured answer:"""
+
+
+async def generate_once(backend, options):
+    start = time.perf_counter()
+    sample = {"ok": False, "first_token_ms": None, "tokens": 0}
+    try:
+        async for _ in backend.stream(PROMPT, options=options):
+            if sample["first_token_ms"] is None:
+                sample["first_token_ms"] = (time.perf_counter() - start) * 1000
+            sample["tokens"] += 1
+        sample["ok"] = True
+    except Exception as e:
+        sample["error"] = str(e)
+    sample["total_ms"] = (time.perf_counter() - start) * 1000
+    if sample["first_token_ms"] is not None and sample["tokens"] > 1:
+        decode_seconds = (sample["total_ms"] - sample["first_token_ms"]) / 1000
+        sample["tokens_per_sec"] = (sample["tokens"] - 1) / decode_seconds if decode_seconds else None
+    return sample
+
+async def run_backend(name, requests, concurrency, max_tokens):
+    backend = get_backend(name)
+    if not backend.available():
+        return {"backend": name, "skipped": "dependencies or model file missing"}
+
+    options = {"temperature": 0, "num_predict": max_tokens}
+    # First call pays for loading weights; report it separately
+    load_start = time.perf_counter()
+    warm = await generate_once(backend, {"temperature": 0, "num_predict": 1})
+    load_ms = (time.perf_counter() - load_start) * 1000
+    if not warm["ok"]:
+        return {"backend": name, "skipped": warm.get("error", "warmup failed")}
+
+    samples, elapsed = await run_pool(requests, concurrency, lambda i: generate_once(backend, options))
+    ok = [s for s in samples if s["ok"]]
+    return {
+        "backend": name,
+        "load_ms": round(load_ms, 2),
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "seconds": round(elapsed, 3),
+        "total_tokens_per_sec": round(sum(s["tokens"] for s in ok) / elapsed, 2) if elapsed else None,
+        "first_token_ms": distribution([s["first_token_ms"] for s in ok if s["first_token_ms"] is not None]),
+        "tokens_per_sec": distribution([s["tokens_per_sec"] for s in ok if s.get("tokens_per_sec")]),
+        "latency_ms": distribution([s["total_ms"] for s in ok])
+    }
+
+async def main(args):
+    results = []
+    for name in args.backends:
+        results.append(await run_backend(name, args.requests, args.concurrency, args.max_tokens))
+        get_backend(name).close()
+    await ollama_client.close()
+    return {
+        "threads": settings.LLM_THREADS or os.cpu_count(),
+        "max_tokens": args.max_tokens,
+        "concurrency": args.concurrency,
+        "hf_batch_size": settings.HF_BATCH_SIZE,
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="*", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--threads", type=int, default=None, help="overrides LLM_THREADS")
+    parser.add_argument("--hf-batch-size", type=int, default=None, help="overrides HF_BATCH_SIZE")
+    args = parser.parse_args()
+
+    if args.threads:
+        settings.LLM_THREADS = args.threads
+    if args.hf_batch_size:
+        settings.HF_BATCH_SIZE = args.hf_batch_size
+    print(json.dumps(asyncio.run(main(args)), indent=2))
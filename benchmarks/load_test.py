@@ -0,0 +1,326 @@
+"""
+End-to-end load test for the LexoraAI API.
+
+Drives concurrent /api/upload-pdf and /api/query(/stream) workloads and
+reports p50/p95/p99 latency, requests/sec and per-stage breakdowns as JSON:
+
+  - queries (streaming): retrieval (until the "sources" event), time to
+    first token, generation, total
+  - uploads: accept (202), queue wait, each ingestion stage from the job's
+    stage_seconds, end to end
+
+Against a server that is already running:
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 --queries 200 --concurrency 16
+
+Self-contained run - starts the fake Ollama in-process and uvicorn as a
+subprocess pointed at it, uploads synthetic PDFs first:
+
+    python -m benchmarks.load_test --spawn-app --uploads 3 --queries 200 \\
+        --output bench.json --baseline previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.synthetic_pdfs import make_corpus
+
+QUESTION_TEMPLATES = [
+    "What does section {n} say about bail?",
+    "Explain the procedure under section {n}",
+    "What is the punishment under section {n}?",
+    "Summarize the conditions laid down in section {n}",
+]
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def distribution(values):
+    return {
+        "p50": round(percentile(values, 50), 2) if values else None,
+        "p95": round(percentile(values, 95), 2) if values else None,
+        "p99": round(percentile(values, 99), 2) if values else None,
+        "mean": round(sum(values) / len(values), 2) if values else None,
+        "max": round(max(values), 2) if values else None,
+    }
+
+def summarize(samples, elapsed):
+    """samples: dicts with 'ok', 'total_ms' and per-stage '<stage>_ms' keys"""
+    ok = [s for s in samples if s["ok"]]
+    stages = sorted({key for s in ok for key in s if key.endswith("_ms") and key != "total_ms"})
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "cached": sum(1 for s in ok if s.get("cached")),
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(ok) / elapsed, 2) if elapsed else None,
+        "latency_ms": distribution([s["total_ms"] for s in ok]),
+        "stages_ms": {
+            stage[:-3]: distribution([s[stage] for s in ok if s.get(stage) is not None])
+            for stage in stages
+        }
+    }
+
+def questions(count, max_section):
+    """Distinct section numbers, so the answer cache only hits on real repeats"""
+    return [
+        QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)].format(n=1 + (i * 7) % max_section)
+        for i in range(count)
+    ]
+
+async def run_pool(count, concurrency, worker):
+    """Run worker(i) for i in range(count) with at most `concurrency` in flight"""
+    queue = asyncio.Queue()
+    for i in range(count):
+        queue.put_nowait(i)
+    samples = []
+
+    async def drain():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            samples.append(await worker(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drain() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+# ============= QUERIES =============
+
+async def query_once(client, question, n_chunks):
+    start = time.perf_counter()
+    try:
+        response = await client.post("/api/query", json={"question": question, "n_chunks": n_chunks})
+        ok = response.status_code == 200 and "answer" in response.json()
+    except httpx.HTTPError:
+        ok = False
+    return {"ok": ok, "total_ms": (time.perf_counter() - start) * 1000}
+
+async def query_stream_once(client, question, n_chunks):
+    start = time.perf_counter()
+    sample = {"ok": False, "retrieval_ms": None, "first_token_ms": None, "generation_ms": None}
+    event = None
+    try:
+        async with client.stream(
+            "POST", "/api/query/stream", json={"question": question, "n_chunks": n_chunks}
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+            else:
+                async for line in response.aiter_lines():
+                    now = (time.perf_counter() - start) * 1000
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        if event == "sources" and sample["retrieval_ms"] is None:
+                            sample["retrieval_ms"] = now
+                        elif event == "token" and sample["first_token_ms"] is None:
+                            sample["first_token_ms"] = now
+                        elif event == "done":
+                            sample["ok"] = True
+                            sample["cached"] = bool(json.loads(line[len("data: "):]).get("cached"))
+                            if sample["first_token_ms"] is not None:
+                                sample["generation_ms"] = now - sample["first_token_ms"]
+                        elif event == "error":
+                            break
+    except httpx.HTTPError:
+        pass
+    sample["total_ms"] = (time.perf_counter() - start) * 1000
+    return sample
+
+async def run_queries(client, count, concurrency, stream=True, n_chunks=5, max_section=300):
+    batch = questions(count, max_section)
+    call = query_stream_once if stream else query_once
+    samples, elapsed = await run_pool(count, concurrency, lambda i: call(client, batch[i], n_chunks))
+    return summarize(samples, elapsed)
+
+# ============= UPLOADS =============
+
+def _seconds_between(start, end):
+    if not start or not end:
+        return None
+    return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() * 1000
+
+async def upload_once(client, pdf_path, doc_type, poll_interval, timeout):
+    start = time.perf_counter()
+    sample = {"ok": False}
+    try:
+        with open(pdf_path, "rb") as f:
+            response = await client.post(
+                "/api/upload-pdf",
+                params={"doc_type": doc_type},
+                files={"file": (os.path.basename(pdf_path), f, "application/pdf")}
+            )
+        sample["accept_ms"] = (time.perf_counter() - start) * 1000
+        if response.status_code != 202:
+            sample["total_ms"] = sample["accept_ms"]
+            return sample
+
+        job_id = response.json()["job_id"]
+        deadline = time.perf_counter() + timeout
+        job = None
+        while time.perf_counter() < deadline:
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(poll_interval)
+
+        sample["total_ms"] = (time.perf_counter() - start) * 1000
+        if job and job["status"] == "completed":
+            sample["ok"] = True
+            sample["cached"] = bool((job.get("result") or {}).get("skipped"))
+            sample["queue_wait_ms"] = _seconds_between(job["created_at"], job["started_at"])
+            for stage, seconds in (job.get("stage_seconds") or {}).items():
+                sample[f"{stage}_ms"] = seconds * 1000
+    except httpx.HTTPError:
+        sample["total_ms"] = (time.perf_counter() - start) * 1000
+    return sample
+
+async def run_uploads(client, pdf_paths, concurrency, doc_type="bench", poll_interval=0.25, timeout=600):
+    samples, elapsed = await run_pool(
+        len(pdf_paths), concurrency,
+        lambda i: upload_once(client, pdf_paths[i], doc_type, poll_interval, timeout)
+    )
+    return summarize(samples, elapsed)
+
+# ============= HARNESS =============
+
+def spawn_app(port, ollama_url):
+    env = dict(os.environ, OLLAMA_URL=ollama_url)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+
+async def wait_ready(client, timeout=120):
+    """Wait for /ready so model and store loading is not measured as request latency"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("LexoraAI did not become ready")
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline):
+    """Percent change of latency percentiles and throughput against a previous report"""
+    delta = {}
+    for workload, result in current["workloads"].items():
+        previous = baseline.get("workloads", {}).get(workload)
+        if not previous:
+            continue
+        changes = {}
+        for key in ("p50", "p95", "p99"):
+            old, new = previous["latency_ms"].get(key), result["latency_ms"].get(key)
+            if old and new is not None:
+                changes[f"latency_{key}_pct"] = round((new - old) / old * 100, 1)
+        old, new = previous.get("requests_per_sec"), result.get("requests_per_sec")
+        if old and new is not None:
+            changes["requests_per_sec_pct"] = round((new - old) / old * 100, 1)
+        delta[workload] = changes
+    return delta
+
+async def main(args):
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "config": vars(args),
+        "workloads": {}
+    }
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.upload_concurrency) + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await wait_ready(client, args.ready_timeout)
+
+        if args.uploads:
+            pdf_dir = args.pdf_dir or tempfile.mkdtemp(prefix="lexora_bench_")
+            pdf_paths = make_corpus(pdf_dir, args.uploads, args.sections)
+            report["workloads"]["upload"] = await run_uploads(client, pdf_paths, args.upload_concurrency)
+
+        if args.queries:
+            name = "query_stream" if args.stream else "query"
+            report["workloads"][name] = await run_queries(
+                client, args.queries, args.concurrency,
+                stream=args.stream, n_chunks=args.n_chunks,
+                max_section=args.uploads * args.sections or 300
+            )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn-app", action="store_true", help="start fake Ollama + uvicorn app.main:app")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--n-chunks", type=int, default=5)
+    parser.add_argument("--uploads", type=int, default=0)
+    parser.add_argument("--upload-concurrency", type=int, default=2)
+    parser.add_argument("--sections", type=int, default=100)
+    parser.add_argument("--pdf-dir", default=None)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="previous report to compare against")
+    args = parser.parse_args()
+
+    fake = None
+    app_process = None
+    try:
+        if args.spawn_app:
+            fake = FakeOllamaServer(
+                port=args.ollama_port,
+                tokens_per_sec=args.tokens_per_sec,
+                first_token_ms=args.first_token_ms,
+                answer_tokens=args.answer_tokens
+            ).start()
+            app_process = spawn_app(args.app_port, fake.url)
+            args.base_url = f"http://127.0.0.1:{args.app_port}"
+
+        report = asyncio.run(main(args))
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                report["delta_vs_baseline"] = compare(report, json.load(f))
+
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(output)
+        print(output)
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        if fake is not None:
+            fake.stop()
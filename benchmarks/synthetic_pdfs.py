@@ -0,0 +1,89 @@
+"""
+Synthetic bare-act PDFs for ingestion benchmarks.
+
+Pages carry numbered section headings ("438. Direction for grant of bail
+...") and sub-clauses, so chunking, citation indexing and retrieval see the
+same shapes as real acts.
+
+    python -m benchmarks.synthetic_pdfs --out bench_pdfs --count 5 --sections 200
+"""
+import argparse
+import os
+import random
+
+import fitz  # PyMuPDF
+
+TITLES = [
+    "Direction for grant of bail to person apprehending arrest",
+    "Procedure when investigation cannot be completed in twenty-four hours",
+    "Power of police officer to require attendance of witnesses",
+    "Information in cognizable cases",
+    "Summons to produce document or other thing",
+    "Punishment for cheating",
+    "Right to freedom of speech and expression",
+    "Maintenance of wives, children and parents",
+]
+
+SENTENCES = [
+    "Where any person has reason to believe that he may be arrested on an accusation of having committed a non-bailable offence, he may apply to the High Court or the Court of Session for a direction under this section.",
+    "The officer in charge of the police station shall forthwith transmit to the nearest Judicial Magistrate a copy of the entries in the diary.",
+    "Every such statement shall be reduced to writing by the officer and read over to the informant.",
+    "Nothing in this section shall apply to any offence punishable with death or imprisonment for life.",
+    "The Magistrate may, for reasons to be recorded in writing, extend the period of detention.",
+    "Whoever cheats shall be punished with imprisonment of either description for a term which may extend to one year, or with fine, or with both.",
+]
+
+
+def section_text(number, rng):
+    lines = [f"{number}. {rng.choice(TITLES)}."]
+    for clause in range(1, rng.randint(2, 4) + 1):
+        body = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 4)))
+        lines.append(f"({clause}) {body}")
+    return "\n".join(lines)
+
+def make_pdf(path, sections=100, seed=0, start_section=1):
+    """Write one PDF with `sections` numbered sections; returns its page count"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    page = None
+    rect = fitz.Rect(50, 50, 545, 792)
+    y = None
+    for number in range(start_section, start_section + sections):
+        text = section_text(number, rng)
+        if page is None or y is None:
+            page = doc.new_page()
+            y = rect.y0
+        box = fitz.Rect(rect.x0, y, rect.x1, rect.y1)
+        spare = page.insert_textbox(box, text, fontsize=10, fontname="helv")
+        if spare < 0:
+            # Did not fit - start a new page and retry there
+            page = doc.new_page()
+            box = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1)
+            spare = page.insert_textbox(box, text, fontsize=10, fontname="helv")
+        y = rect.y1 - spare + 8 if spare >= 0 else None
+    pages = doc.page_count
+    doc.save(path)
+    doc.close()
+    return pages
+
+def make_corpus(out_dir, count=3, sections=100, seed=0):
+    """Write `count` PDFs with distinct content; returns their paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(out_dir, f"synthetic_act_{i + 1}.pdf")
+        make_pdf(path, sections=sections, seed=seed + i, start_section=1 + i * sections)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench_pdfs")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for path in make_corpus(args.out, args.count, args.sections, args.seed):
+        print(path)
@@ -1,21 +1,35 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
-
-# Create client with default settings (no arguments)
-client = chromadb.Client()
-
-# Create or get the collection
-collection = client.get_or_create_collection("legal_doc_chunks")
-
-model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
+from app.core.embedding_cache import cached_embed
+
+MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
+
+# Client, collection and model are created on first use
+_collection = None
+_model = None
+
+def get_collection():
+    global _collection
+    if _collection is None:
+        import chromadb
+        # Create client with default settings (no arguments)
+        client = chromadb.Client()
+        # Create or get the collection
+        _collection = client.get_or_create_collection("legal_doc_chunks")
+    return _collection
+
+def get_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(MODEL_NAME)
+    return _model
 
 def embed_text(text_chunks):
-    return model.encode(text_chunks).tolist()
+    return cached_embed(MODEL_NAME, text_chunks, lambda texts: get_model().encode(texts))
 
 def store_chunks(chunks):
     embeddings = embed_text(chunks)
     ids = [f"chunk_{i}" for i in range(len(chunks))]
-    collection.add(
+    get_collection().add(
         ids=ids,
         documents=chunks,
         embeddings=embeddings
@@ -26,8 +40,8 @@ def store_chunks(chunks):
     print(f"Stored {len(chunks)} chunks in ChromaDB.")
 
 def query_chroma(query, top_k=3):
-    query_embedding = model.encode([query]).tolist()
-    results = collection.query(query_embeddings=query_embedding, n_results=top_k)
+    query_embedding = embed_text([query])
+    results = get_collection().query(query_embeddings=query_embedding, n_results=top_k)
     return results
 
 if __name__ == "__main__":
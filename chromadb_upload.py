@@ -1,59 +1,196 @@
-import chromadb
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PyPDF2 import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.core.chromadb_manager import chroma_db_manager
+from app.core.config import settings
+from app.core.database import init_db
+from app.core.lexora import LexoraAI, embed_chunks, file_sha256, split_text
+from app.core.maintenance import rebuild_collection
+from app.services.pdf_extraction import extract_pdf_text, shutdown_extraction_pool
 
+# HNSW settings for the staging collection of a rebuild: insert into the graph
+# and persist it in large batches instead of after every small add. Chroma
+# cannot change them after creation, so the corpus is copied into a collection
+# with the serving settings once loaded (a large brute-force buffer would
+# otherwise slow every query).
+BULK_HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:batch_size": 10000,
+    "hnsw:sync_threshold": 100000,
+}
+
+
+class BulkWriter:
+    """Buffers planned files and embeds their new chunks together, one embed call per batch across files.
+
+    Files go through the same content-hash planning as API uploads, so only
+    chunks that are not stored yet get embedded. Storing a batch
+    (LexoraAI.store_chunks: ChromaDB, indexes, chunk catalog, Document row)
+    overlaps with embedding the next one.
+    """
+
+    def __init__(self, lexora, doc_type, batch_size):
+        self.lexora = lexora
+        self.doc_type = doc_type
+        self.batch_size = batch_size
+        self.files = []
+        self.queued = 0
+        self.added = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def add(self, source, chunks, file_hash):
+        plan = self.lexora.plan_chunks(source, chunks, self.doc_type)
+        self.files.append((source, chunks, file_hash, plan))
+        self.queued += len(plan["new"])
+        if self.queued >= self.batch_size:
+            self.flush()
+        return plan
+
+    def flush(self):
+        if not self.files:
+            return
+        files, self.files, self.queued = self.files, [], 0
+        texts = [chunks[idx] for _, chunks, _, plan in files for idx in plan["new"]]
+
+        start = time.perf_counter()
+        embeddings = embed_chunks(texts) if texts else []
+        self.embed_seconds += time.perf_counter() - start
+
+        self._wait()
+        self._pending = self._executor.submit(self._store, files, embeddings)
+
+    def close(self):
+        self.flush()
+        self._wait()
+        self._executor.shutdown()
+
+    def _store(self, files, embeddings):
+        start = time.perf_counter()
+        offset = 0
+        for source, chunks, file_hash, plan in files:
+            count = len(plan["new"])
+            result = self.lexora.store_chunks(
+                source,
+                chunks,
+                doc_type=self.doc_type,
+                embeddings=embeddings[offset:offset + count] if count else None,
+                file_hash=file_hash,
+                plan=plan
+            )
+            offset += count
+            self.added += result["added"]
+            self.removed += result["removed"]
+            self.unchanged += result["unchanged"]
+        self.write_seconds += time.perf_counter() - start
+
+    def _wait(self):
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+
+def upload_pdfs_chunked_to_chromadb(pdf_folder, collection_name="crpc_chapters_chunked", chunk_size=1000, batch_size=512, rebuild=False, doc_type="bare_act"):
+    """Upload PDFs to ChromaDB with persistent storage.
+
+    Each PDF is one source (its file name) with content-addressed chunk ids,
+    exactly like an upload through the API: unchanged files are skipped and
+    edited ones only embed their new chunks. New chunks are embedded in
+    batches of `batch_size` across files.
+    With rebuild=True every file is re-ingested into a staging collection
+    with HNSW settings tuned for bulk loading, then copied (embeddings
+    included) into a collection with the serving settings that replaces the
+    live one. If a rebuild stops before that swap, the live collection is
+    untouched but the indexes describe the staging one: run --rebuild again.
+    """
 
-def upload_pdfs_chunked_to_chromadb(pdf_folder, collection_name="crpc_chapters_chunked", chunk_size=1000):
-    """Upload PDFs to ChromaDB with persistent storage"""
-    
     # ✅ PERSISTENT CLIENT - saves data to ./chromadb_data folder
-    client = chromadb.PersistentClient(path="./chromadb_data")
-    
-    collection = client.get_or_create_collection(
-        name=collection_name,
-        metadata={"hnsw:space": "cosine"}
-    )
-    
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", " ", ""]
-    )
-    
-    pdf_files = sorted(Path(pdf_folder).glob("*.pdf"))
-    doc_count = 0
-    
-    for pdf_file in pdf_files:
+    client, _ = chroma_db_manager.initialize(db_path=settings.CHROMA_PATH, collection_name=collection_name)
+    init_db()
+    lexora = LexoraAI()
+
+    staging_name = f"{collection_name}__bulk"
+    if rebuild:
         try:
-            reader = PdfReader(str(pdf_file))
-            text = "\n".join([page.extract_text() for page in reader.pages])
-            chunks = splitter.split_text(text)
-            
-            for chunk_idx, chunk in enumerate(chunks):
-                doc_id = f"{pdf_file.stem}_chunk_{chunk_idx}"
-                collection.add(
-                    ids=[doc_id],
-                    documents=[chunk],
-                    metadatas=[{
-                        "filename": pdf_file.name,
-                        "chunk_id": chunk_idx,
-                        "total_chunks": len(chunks),
-                        "source": "CrPC-1973"
-                    }]
-                )
-                doc_count += 1
-            
-            print(f"✓ {pdf_file.name}: {len(chunks)} chunks uploaded")
-        except Exception as e:
-            print(f"✗ Error: {pdf_file.name} - {e}")
-    
-    print(f"\n✓ Total chunks uploaded: {doc_count}")
-    return collection
+            client.delete_collection(staging_name)
+        except Exception:
+            pass
+        staging = client.create_collection(
+            name=staging_name,
+            metadata=BULK_HNSW_METADATA
+        )
+        # Forget what is stored so every file is planned as new, then load into staging
+        lexora.reset_indexes()
+        chroma_db_manager.use_collection(staging)
+
+    max_batch_size = getattr(client, "get_max_batch_size", lambda: batch_size)()
+    writer = BulkWriter(lexora, doc_type, min(batch_size, max_batch_size))
+
+    pdf_files = sorted(Path(pdf_folder).glob("*.pdf"))
+    skipped = 0
+    start = time.perf_counter()
+
+    try:
+        for pdf_file in pdf_files:
+            source = pdf_file.name
+            try:
+                file_hash = file_sha256(pdf_file)
+                if lexora.is_unchanged(source, file_hash, doc_type):
+                    skipped += 1
+                    print(f"= {source}: unchanged, skipped")
+                    continue
+                text = extract_pdf_text(pdf_file)
+                chunks = split_text(text, chunk_size=chunk_size, overlap=200)
+                plan = writer.add(source, chunks, file_hash)
+                print(f"✓ {source}: {len(chunks)} chunks, {len(plan['new'])} to embed")
+            except Exception as e:
+                print(f"✗ Error: {source} - {e}")
+
+        writer.close()
+    finally:
+        shutdown_extraction_pool()
+
+    copy_seconds = 0.0
+    if rebuild:
+        copy_start = time.perf_counter()
+        # Same rename-aside swap as compaction: the live collection is only
+        # dropped once the complete copy holds its name
+        rebuild_collection(min(settings.COMPACT_BATCH_SIZE, max_batch_size), source=staging)
+        client.delete_collection(staging_name)
+        copy_seconds = time.perf_counter() - copy_start
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ {len(pdf_files) - skipped} files ingested, {skipped} unchanged: "
+          f"{writer.added} chunks added, {writer.removed} removed, {writer.unchanged} unchanged")
+    print(f"✓ {elapsed:.1f}s total "
+          f"(embed {writer.embed_seconds:.1f}s, write {writer.write_seconds:.1f}s, "
+          f"copy to serving collection {copy_seconds:.1f}s)")
+    return chroma_db_manager.get_collection()
 
 
 if __name__ == "__main__":
-    pdf_path = r"C:\Users\gokul\Downloads\booksss\CrPC"
+    parser = argparse.ArgumentParser(description="Bulk-load PDFs into ChromaDB")
+    parser.add_argument("pdf_folder", nargs="?", default=r"C:\Users\gokul\Downloads\booksss\CrPC")
+    parser.add_argument("--collection", default="crpc_chapters_chunked")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--doc-type", default="bare_act")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="re-ingest every file into a staging collection, then replace the collection with it")
+    args = parser.parse_args()
+
     print("Starting ChromaDB upload with persistent storage...\n")
-    collection = upload_pdfs_chunked_to_chromadb(pdf_path)
+    collection = upload_pdfs_chunked_to_chromadb(
+        args.pdf_folder,
+        collection_name=args.collection,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        rebuild=args.rebuild,
+        doc_type=args.doc_type
+    )
     print("Upload complete! Data saved to ./chromadb_data/")
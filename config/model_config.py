@@ -4,23 +4,27 @@ Model configuration for Indian Legal Assistant GGUF
 """
 from langchain_community.llms import LlamaCpp
 
+from app.core.config import settings
+from app.core.llm_backends import cpu_threads
+
 def load_legal_model():
-    """Initialize GGUF model with GPU acceleration"""
+    """Initialize the GGUF model; GPU offload and CPU threads come from settings"""
     
     print("Loading Indian Legal Assistant GGUF model...")
     
     # Initialize LlamaCpp with GGUF model
     llm = LlamaCpp(
-        model_path="./models/indian_legal_assitant-q6_k.gguf",
-        n_gpu_layers=35,  # GPU offload (all layers to GPU)
-        n_ctx=2048,  # Context window
-        n_batch=512,  # Batch size
+        model_path=settings.LLAMACPP_MODEL_PATH,
+        n_gpu_layers=settings.LLAMACPP_N_GPU_LAYERS,  # 0 on CPU-only machines, 35 offloads every layer
+        n_threads=cpu_threads(),
+        n_ctx=settings.LLAMACPP_N_CTX,  # Context window
+        n_batch=settings.LLAMACPP_N_BATCH,  # Batch size
         temperature=0.7,
-        max_tokens=256,
+        max_tokens=settings.LLM_MAX_TOKENS,
         verbose=True  # Show loading progress
     )
     
-    print("✅ Model loaded successfully on GPU!")
+    print("✅ Model loaded successfully!")
     return llm
 
 _model_instance = None
@@ -1,11 +1,25 @@
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from app.core.embedding_cache import cached_embed
 
-model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
+MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
+_model = None
+
+def get_model():
+    #Load the model on first use so importing this module stays cheap
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(MODEL_NAME)
+    return _model
 
 def embed_text(text_chunks):
-    #Convert list of text chunks into vector embeddings
-    embeddings = model.encode(text_chunks, show_progress_bar=True)
-    return embeddings
+    #Convert list of text chunks into vector embeddings (cached on disk by text hash)
+    embeddings = cached_embed(
+        MODEL_NAME,
+        text_chunks,
+        lambda texts: get_model().encode(texts, show_progress_bar=True)
+    )
+    return np.array(embeddings, dtype=np.float32)
 
 if __name__ == "__main__":
     sample_chunks = [
@@ -1,53 +1,44 @@
 import os
 from document_ingestion import ingest_document
-from sentence_transformers import SentenceTransformer
-import chromadb
-from transformers import AutoTokenizer, Gemma3ForCausalLM
-import torch
-from safetensors.torch import load_file
+from app.core.context_packer import context_budget, pack_context
+from app.core.embedding_cache import cached_embed
+from app.core.llm_backends import HFGemmaBackend
 
 
 # Load your fine-tuned Gemma generative model
 model_name = "google/gemma-3-1b-it"  # Base model from Hugging Face
 adapter_path = r"D:\GOKUL-UG\VIT\Projects\AI\GenAI\finetuned-gemma\adapter_model.safetensors"
 
+# Embedding model with different variable name to avoid conflict
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
 
-# Load tokenizer from Hugging Face
-tokenizer = AutoTokenizer.from_pretrained(model_name)
+# The Chroma collection and embedding model are loaded on first use, not at import
+_collection = None
+_embedding_model = None
 
+# Gemma plus the adapter, through the shared HF backend (loaded on first generate)
+generator = HFGemmaBackend(model_name, adapter_path)
 
-# Load base model from Hugging Face
-generative_model = Gemma3ForCausalLM.from_pretrained(
-    model_name,
-    torch_dtype=torch.bfloat16
-)
 
+def get_collection():
+    global _collection
+    if _collection is None:
+        import chromadb
+        client = chromadb.Client()
+        _collection = client.get_or_create_collection("legal_doc_chunks")
+    return _collection
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-generative_model.to(device)
 
-
-# Load and apply your fine-tuned adapter weights on top of base model using safetensors
-adapter_weights = load_file(adapter_path, device="cpu")
-generative_model.load_state_dict(adapter_weights, strict=False)
-
-
-# Set device (GPU if available)
-generative_model.to(device)
-generative_model.eval()
-
-
-# Initialize Chroma client and collection
-client = chromadb.Client()
-collection = client.get_or_create_collection("legal_doc_chunks")
-
-
-# Load embedding model with different variable name to avoid conflict
-embedding_model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
+def get_embedding_model():
+    global _embedding_model
+    if _embedding_model is None:
+        from sentence_transformers import SentenceTransformer
+        _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _embedding_model
 
 
 def embed_text(text_chunks):
-    return embedding_model.encode(text_chunks).tolist()
+    return cached_embed(EMBEDDING_MODEL_NAME, text_chunks, lambda texts: get_embedding_model().encode(texts))
 
 
 def process_and_store(file_path):
@@ -56,32 +47,39 @@ def process_and_store(file_path):
 
     embeddings = embed_text(chunks)
     ids = [f"{os.path.basename(file_path)}_chunk_{i}" for i in range(len(chunks))]
-    collection.add(ids=ids, documents=chunks, embeddings=embeddings)
+    get_collection().add(ids=ids, documents=chunks, embeddings=embeddings)
     print(f"Stored {len(chunks)} chunks from {file_path}.")
 
 
 def query_documents(query, top_k=5):
-    query_embedding = embedding_model.encode([query]).tolist()
-    results = collection.query(query_embeddings=query_embedding, n_results=top_k)
+    query_embedding = embed_text([query])
+    results = get_collection().query(query_embeddings=query_embedding, n_results=top_k)
     return results['documents'][0]
 
 
 def generate_text(prompt, max_length=200):
-    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=1024).to(device)
-    with torch.inference_mode():
-        outputs = generative_model.generate(**inputs, max_new_tokens=max_length)
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+    return generator.generate_sync(prompt, {"num_predict": max_length, "temperature": 0})
+
+
+def packed_prompt(build_prompt, chunks, max_length=200):
+    """Fill build_prompt(context) with as many chunks as Gemma's input window holds"""
+    budget = context_budget(
+        generator.max_prompt_tokens(max_length),
+        generator.count_tokens(build_prompt(""))
+    )
+    return build_prompt(pack_context(chunks, budget, generator.count_tokens)["text"])
 
 
 def summarize_chunks(chunks):
-    combined_text = " ".join(chunks)[:3000]
-    prompt = f"Summarize the following text:\n{combined_text}"
+    prompt = packed_prompt(lambda context: f"Summarize the following text:\n{context}", chunks)
     return generate_text(prompt)
 
 
 def answer_question(question, chunks):
-    combined_text = " ".join(chunks)[:3000]
-    prompt = f"Based on the following text:\n{combined_text}\nAnswer this question:\n{question}"
+    prompt = packed_prompt(
+        lambda context: f"Based on the following text:\n{context}\nAnswer this question:\n{question}",
+        chunks
+    )
     return generate_text(prompt)
 
 